@@ -1,3 +1,4 @@
+from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
@@ -16,7 +17,13 @@ class Settings(BaseSettings):
     jwt_expiration: int = 120
     jwt_refresh_expiration: int = 1440
     jwt_reset_expiration: int = 1440
+    bcrypt_rounds: int = 12
+    bcrypt_target_ms: int = 0
     max_assignments_per_agent: int = 3
+    outbound_workers: int = Field(default=4, ge=1)
+    shutdown_drain_timeout: float = 10
+    default_message_delay: int = 1800
+    jobs_poll_interval: float = 5
     root_path: str = ""
     logging_level: str = "INFO"
     testing: bool = False
@@ -27,6 +34,9 @@ class Settings(BaseSettings):
     smtp_port: int = 587
     redis_host: str = "localhost"
     redis_port: int = 6379
+    db_pool_size: int = 20
+    db_max_overflow: int = 10
+    db_pool_recycle: int = 1800
     model_config = SettingsConfigDict(env_file=".env", extra="ignore")
 
 
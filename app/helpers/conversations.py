@@ -215,7 +215,7 @@ def create_conversation(data: dict) -> Conversation:
             session.commit()
             session.refresh(new_conversation)
             session.close()
-            return new_conversation.to_dict()
+            return new_conversation
     except Exception as e:
         raise Exception(f"Ocurrió un error al crear la conversación: {str(e)}")
 
@@ -241,12 +241,15 @@ def unable_end_conversation_conditional(assigned_user, session_user) -> bool:
             )
 
 
-async def massive_asignation() -> None:
+async def massive_asignation() -> dict[int, int]:
     """
     Assigns conversations to available agents in a massive assignment process.
 
     This function retrieves the conversations with the longest wait time and assigns them to the available agents.
     It continues the process until there are no more conversations or available agents.
+
+    Returns:
+    dict[int, int]: The ID of the agent assigned to each conversation, keyed by conversation ID.
     """
     pending_conversations = get_longest_wait_time_conversation(all=True)
     available_agents = [{ 
@@ -257,6 +260,7 @@ async def massive_asignation() -> None:
                         } for row in get_best_free_agent(all=True)]
 
     retries = {}
+    assignments = {}
     while True:
         if len(pending_conversations) == 0:
             break
@@ -266,6 +270,7 @@ async def massive_asignation() -> None:
         temp_agent = available_agents.pop(0)
         response = await assign_conversation_to_agent(temp_conversation.id, temp_agent['id'])
         if response.success:
+            assignments[temp_conversation.id] = temp_agent['id']
             logger.info( 
                 "Asignado chat {} para el usuario {}".format(
                     temp_conversation.id, 
@@ -286,6 +291,7 @@ async def massive_asignation() -> None:
                 available_agents = [temp_agent] + available_agents
             else:
                 break
+    return assignments
 
 
 def set_uncount_messages(id: int, count: int) -> None:
@@ -1,12 +1,81 @@
 from contextlib import closing
 from app.helpers.message_media import detect_mime_type
 from app.models.conversation import Conversation
-from app.models.message import Message, SenderTypeEnum
+from app.models.message import Message, MessageStatusEnum, SenderTypeEnum
 from app.models.message_media import MessageMedia
 from app.models.user import User
 from app.utilities.db import get_session
+from app.utilities.logger import logger
 from app.utilities.socket import socket_manager
-from sqlalchemy import select
+from sqlalchemy import select, update, or_
+
+
+def _get_conversation(session, conversation_id: int|str) -> Conversation | None:
+    """
+    Retrieves a conversation by its ID or its thread ID within a session.
+
+    Args:
+    - session (Session): The database session.
+    - conversation_id (int|str): The ID or the thread ID of the conversation.
+
+    Returns:
+    - Conversation | None: The conversation, or None if not found.
+    """
+    if isinstance(conversation_id, int):
+        return session.query(Conversation).filter(
+            Conversation.id==conversation_id
+        ).first()
+    if isinstance(conversation_id, str):
+        return session.query(Conversation).filter(
+            Conversation.conversation_id==conversation_id
+        ).first()
+    return None
+
+
+def _add_message(session, conversation: Conversation, message: Message, media_dict: dict | None) -> dict | None:
+    """
+    Adds a message and its media to a session, updating the conversation summary.
+
+    Args:
+    - session (Session): The database session.
+    - conversation (Conversation): The conversation the message belongs to.
+    - message (Message): The message to be added.
+    - media_dict (dict | None): A dictionary containing media information.
+
+    Returns:
+    - dict | None: The media information as a dictionary, or None if the message has no media.
+    """
+    message_media = None
+    conversation.last_message = "Archivo adjunto" if media_dict else message.content
+    if unread_conditional(message, conversation):
+        conversation.unread_count += 1
+    if (media_dict):
+        media_url = media_dict.get('media_url', None)
+        mime_type = media_dict.get('mime_type', None)
+        if (mime_type is None):
+            file_data = detect_mime_type(media_url)
+        else:
+            file_data = [
+                media_dict.get('filename'),
+                media_dict.get('mime_type'),
+                media_dict.get('size',-1)
+            ]
+        if file_data and media_url:
+            message_media = MessageMedia(
+                filename=file_data[0],
+                url=media_url,
+                mime_type=file_data[1],
+                size=file_data[2],
+                sender=SenderTypeEnum.CLIENT.value,
+            )
+            session.add(message_media)
+            # Flush to get the media id without reading the encoded file back
+            session.flush()
+            message.message_media_id = message_media.id
+    conversation.last_message = 'Archivo adjunto' if not message.content and message_media else message.content
+    session.add(message)
+    # Built before commit, which would expire the media row and reload it on access
+    return message_media.to_dict() if message_media else None
 
 
 def save_message(message: Message, conversation_id: int|str, media_dict: dict = None) -> tuple[Message, dict | None]:
@@ -23,47 +92,11 @@ def save_message(message: Message, conversation_id: int|str, media_dict: dict =
     """
     try:
         with closing(next(get_session("multiagent"))) as session:
-            message_media = None
-            conversation: Conversation|None = None
-            if isinstance(conversation_id, int):
-                conversation = session.query(Conversation).filter(
-                    Conversation.id==conversation_id
-                ).first()
-            elif isinstance(conversation_id, str):
-                conversation = session.query(Conversation).filter(
-                    Conversation.conversation_id==conversation_id
-                ).first()
-            conversation.last_message = "Archivo adjunto" if media_dict else message.content
-            if unread_conditional(message, conversation):
-                conversation.unread_count += 1
-            if (media_dict):
-                media_url = media_dict.get('media_url', None)
-                mime_type = media_dict.get('mime_type', None)
-                if (mime_type is None):
-                    file_data = detect_mime_type(media_url)
-                else:
-                    file_data = [
-                        media_dict.get('filename'),
-                        media_dict.get('mime_type'),
-                        media_dict.get('size',-1)
-                    ]
-                if file_data and media_url:
-                    message_media = MessageMedia(
-                        filename=file_data[0],
-                        url=media_url,
-                        mime_type=file_data[1],
-                        size=file_data[2],
-                        sender=SenderTypeEnum.CLIENT.value,
-                    )
-                    session.add(message_media)
-                    session.commit()
-                    session.refresh(message_media)
-                    message.message_media_id = message_media.id
-            conversation.last_message = 'Archivo adjunto' if not message.content and message_media else message.content
-            session.add(message)
+            conversation = _get_conversation(session, conversation_id)
+            media_response = _add_message(session, conversation, message, media_dict)
             session.commit()
             session.refresh(message)
-            response = message, message_media.to_dict() if message_media else None
+            response = message, media_response
             session.close()
             return response
     except Exception as e:
@@ -71,6 +104,41 @@ def save_message(message: Message, conversation_id: int|str, media_dict: dict =
     return None, None
 
 
+def save_messages(
+    messages: list[tuple[Message, dict | None]],
+    conversation_id: int|str
+) -> list[tuple[Message, dict | None]] | None:
+    """
+    Saves several messages of the same conversation in a single transaction.
+
+    Args:
+    - messages (list[tuple[Message, dict | None]]): The messages to be saved, each with its media information, in order.
+    - conversation_id (int|str): The ID of the conversation the messages belong to.
+
+    Returns:
+    - list[tuple[Message, dict | None]] | None: The saved messages with their media information as dictionaries, or None if an error occurs.
+    """
+    try:
+        with closing(next(get_session("multiagent"))) as session:
+            conversation = _get_conversation(session, conversation_id)
+            media_responses = [
+                _add_message(session, conversation, message, media_dict)
+                for message, media_dict in messages
+            ]
+            session.commit()
+            for message, _ in messages:
+                session.refresh(message)
+            response = [
+                (message, media_response)
+                for (message, _), media_response in zip(messages, media_responses)
+            ]
+            session.close()
+            return response
+    except Exception as e:
+        logger.error(f"Error saving messages: {e}")
+    return None
+
+
 def get_all_messages_by_conversation(id: str) -> list[dict] | None:
     """
     Retrieves all messages from a conversation.
@@ -97,7 +165,8 @@ def get_all_messages_by_conversation(id: str) -> list[dict] | None:
                 Message.message_media_id == MessageMedia.id,
                 isouter=True
             ).filter(
-                Message.conversation_id==id
+                Message.conversation_id==id,
+                or_(Message.status.is_(None), Message.status != MessageStatusEnum.FAILED)
             ).order_by(Message.created_at)
             messages_list = session.execute(messages_list_query).all()
             messages_list_transformed = [
@@ -120,6 +189,54 @@ def get_all_messages_by_conversation(id: str) -> list[dict] | None:
     return None
 
 
+def set_message_status(message_id: int, status: MessageStatusEnum) -> bool:
+    """
+    Updates the delivery status of a message.
+
+    Args:
+    - message_id (int): The ID of the message to be updated.
+    - status (MessageStatusEnum): The new delivery status.
+
+    Returns:
+    - bool: True if the message is updated successfully, False otherwise.
+    """
+    try:
+        with closing(next(get_session("multiagent"))) as session:
+            session.execute(update(Message).where(Message.id==message_id).values(status=status))
+            session.commit()
+            session.close()
+    except Exception as e:
+        logger.error(f"Error updating message status: {e}")
+        return False
+    return True
+
+
+def mark_message_sent(message_id: int) -> bool:
+    """
+    Marks a message as delivered to the client.
+
+    Args:
+    - message_id (int): The ID of the message.
+
+    Returns:
+    - bool: True if the message is updated successfully, False otherwise.
+    """
+    return set_message_status(message_id, MessageStatusEnum.SENT)
+
+
+def mark_message_failed(message_id: int) -> bool:
+    """
+    Marks a message as not delivered to the client.
+
+    Args:
+    - message_id (int): The ID of the message.
+
+    Returns:
+    - bool: True if the message is updated successfully, False otherwise.
+    """
+    return set_message_status(message_id, MessageStatusEnum.FAILED)
+
+
 def delete_message(message_id: int) -> bool:
     """
     Deletes a message from the database.
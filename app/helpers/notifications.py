@@ -0,0 +1,28 @@
+from app.helpers.users import get_notification_recipients
+from app.models.user import UserRoleEnum
+
+
+def build_recipients(
+    assigned_user_id: int | None,
+    include_role: int = UserRoleEnum.PRINCIPAL.value,
+    exclude_user_id: int | None = None
+) -> frozenset[int]:
+    """
+    Builds the IDs of the users to notify about an event of a conversation: the
+    assigned user, its ancestors and every user with the given role.
+
+    Args:
+        assigned_user_id (int | None): The ID of the user assigned to the conversation.
+        include_role (int): The ID of the role whose users are always notified.
+        exclude_user_id (int | None): The ID of a user that must not be notified.
+
+    Returns:
+        frozenset[int]: The IDs of the users to notify, empty if they could not be retrieved.
+    """
+    recipients = get_notification_recipients(assigned_user_id, include_role)
+    if recipients is None:
+        return frozenset()
+    if assigned_user_id:
+        recipients.add(assigned_user_id)
+    recipients.discard(exclude_user_id)
+    return frozenset(recipients)
@@ -1,8 +1,44 @@
 from fastapi import Response
 from app.config import settings
+from app.utilities.logger import logger
+from typing import Awaitable, Callable
+import asyncio
 import json
 import httpx
 
+
+# Outbound messages are sharded by conversation, so each conversation keeps
+# its order while different conversations are delivered concurrently.
+_outbound_queues: list[asyncio.Queue] = []
+_outbound_workers: list[asyncio.Task] = []
+
+# Pooled client shared by every call to the chatbot, so connections are reused
+_client: httpx.AsyncClient | None = None
+
+
+def _get_client() -> httpx.AsyncClient:
+    """
+    Retrieves the shared HTTP client, creating it on first use.
+
+    Returns:
+    - httpx.AsyncClient: The shared client.
+    """
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(verify=False)
+    return _client
+
+
+async def close_client() -> None:
+    """
+    Closes the shared HTTP client and its pooled connections.
+    """
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+
+
 async def send_message(to_number: str, body: str, media_dict: dict = None, user_name: str = None) -> Response:
     """
     Sends a message to a WhatsApp number.
@@ -25,10 +61,9 @@ async def send_message(to_number: str, body: str, media_dict: dict = None, user_
         "Content-Type": "application/json"
     }
     if not settings.testing:
-        async with httpx.AsyncClient(verify=False) as client:
-            if media_dict:
-                data['media_url'] = media_dict['media_url']
-            response = await client.post(url, json=data, headers=headers)
+        if media_dict:
+            data['media_url'] = media_dict['media_url']
+        response = await _get_client().post(url, json=data, headers=headers)
     else:
         response = Response(status_code=200, content=json.dumps({"status": True, "message":"Envio de mensaje correcto"}))
     return response
@@ -56,8 +91,7 @@ async def assing_agent_message(to_number: str, agent_name: str) -> Response:
         "Content-Type": "application/json"
     }
     if not settings.testing:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.post(url, json=data, headers=headers)
+        response = await _get_client().post(url, json=data, headers=headers)
     else:
         response = Response(status_code=200, content=json.dumps({"status": True, "message":"Envio de mensaje correcto"}))
     return response
@@ -86,8 +120,115 @@ async def end_conversation(conversation_id: str, to_number: str, agent_name: str
         "Content-Type": "application/json"
     }
     if not settings.testing:
-        async with httpx.AsyncClient(verify=False) as client:
-            response = await client.post(url, json=data, headers=headers)
+        response = await _get_client().post(url, json=data, headers=headers)
     else:
         response = Response(status_code=200, content=json.dumps({"status": True, "message":"Envio de mensaje correcto"}))
-    return response
\ No newline at end of file
+    return response
+
+
+async def _deliver(
+        to_number: str, body: str, media_dict: dict | None, user_name: str | None,
+        on_success: Callable[[], Awaitable[None]] | None,
+        on_error: Callable[[], Awaitable[None]]
+    ) -> None:
+    """
+    Sends an outbound message and awaits the callback matching its outcome.
+
+    Args:
+    - to_number (str): The WhatsApp number to send the message to.
+    - body (str): The message body.
+    - media_dict (dict | None): A dictionary containing the media URL.
+    - user_name (str | None): The name of the agent sending the message.
+    - on_success (Callable[[], Awaitable[None]] | None): Callback awaited once the message is delivered.
+    - on_error (Callable[[], Awaitable[None]]): Callback awaited if the message could not be delivered.
+    """
+    try:
+        response = await send_message(to_number, body, media_dict, user_name)
+        delivered = response.status_code == httpx.codes.OK
+        if not delivered:
+            logger.error("Error sending message to client")
+    except Exception as e:
+        # Any failure (HTTP, invalid URL, bad payload) leaves the message undelivered
+        logger.error(f"Error sending message to client: {e}")
+        delivered = False
+    if not delivered:
+        await on_error()
+    elif on_success is not None:
+        await on_success()
+
+
+async def _outbound_worker(queue: asyncio.Queue) -> None:
+    """
+    Delivers the queued outbound messages of a shard, one at a time.
+
+    Args:
+    - queue (asyncio.Queue): The queue of the shard to drain.
+    """
+    while True:
+        item = await queue.get()
+        try:
+            await _deliver(*item)
+        except Exception as e:
+            logger.error(f"Error in outbound worker: {e}")
+        finally:
+            queue.task_done()
+
+
+def start_outbound_workers() -> None:
+    """
+    Starts the workers that deliver queued outbound messages.
+    """
+    for _ in range(settings.outbound_workers):
+        queue = asyncio.Queue()
+        _outbound_queues.append(queue)
+        _outbound_workers.append(asyncio.create_task(_outbound_worker(queue)))
+
+
+async def stop_outbound_workers() -> None:
+    """
+    Stops the outbound workers once the queued messages are delivered, or once
+    settings.shutdown_drain_timeout expires, whichever happens first.
+    """
+    if _outbound_queues:
+        try:
+            await asyncio.wait_for(
+                asyncio.gather(*(queue.join() for queue in _outbound_queues)),
+                settings.shutdown_drain_timeout
+            )
+        except asyncio.TimeoutError:
+            pending = sum(queue.qsize() for queue in _outbound_queues)
+            logger.error(f"Stopping outbound workers with {pending} messages still queued")
+    for worker in _outbound_workers:
+        worker.cancel()
+    await asyncio.gather(*_outbound_workers, return_exceptions=True)
+    _outbound_workers.clear()
+    _outbound_queues.clear()
+
+
+async def enqueue_message(
+        conversation_id: int, to_number: str, body: str,
+        on_error: Callable[[], Awaitable[None]],
+        on_success: Callable[[], Awaitable[None]] | None = None,
+        media_dict: dict = None, user_name: str = None
+    ) -> None:
+    """
+    Queues a message to a WhatsApp number, to be sent by the outbound workers.
+
+    Args:
+    - conversation_id (int): The ID of the conversation the message belongs to.
+    - to_number (str): The WhatsApp number to send the message to.
+    - body (str): The message body.
+    - on_error (Callable[[], Awaitable[None]]): Callback awaited if the message could not be delivered.
+    - on_success (Callable[[], Awaitable[None]], optional): Callback awaited once the message is delivered. Defaults to None.
+    - media_dict (dict, optional): A dictionary containing the media URL. Defaults to None.
+    - user_name (str, optional): The name of the agent sending the message. Defaults to None.
+    """
+    item = (to_number, body, media_dict, user_name, on_success, on_error)
+    if not _outbound_queues:
+        # Workers are not running (e.g. outside the application lifespan), so
+        # the message is delivered inline instead of being lost
+        logger.error("Outbound workers are not running, sending message inline")
+        await _deliver(*item)
+        return
+    queue = _outbound_queues[conversation_id % len(_outbound_queues)]
+    await queue.put(item)
@@ -7,12 +7,16 @@ from app.models.conversation import ConversationStateEnum, Conversation
 from app.config import settings
 from app.utilities.logger import logger
 from app.utilities.socket import socket_manager
+from app.utilities import jobs
 from app.models.websockets import Notification, ConversationData, NotificationType
 from app.helpers.twilio import assing_agent_message
 
+from cachetools import TTLCache
 from contextlib import closing
+from threading import Lock
 
-from sqlalchemy import func, select, or_
+from sqlalchemy import func, literal_column, select, update, or_
+from sqlalchemy.orm import contains_eager, joinedload
 
 from pydantic import BaseModel
 from datetime import datetime, tzinfo, time
@@ -20,6 +24,24 @@ from datetime import datetime, tzinfo, time
 import math
 import pytz
 
+
+# Roles and states are small, near-static catalogs; keep them in memory
+# instead of joining them on every user query.
+_catalogs_cache = TTLCache(maxsize=2, ttl=300)
+_catalogs_lock = Lock()
+
+# Users resolved from access tokens, shared between requests for a few seconds
+_users_cache = TTLCache(maxsize=4096, ttl=30)
+_users_cache_lock = Lock()
+
+# Members of the roles notified about every conversation event; rosters change
+# on human timescales, so a short TTL keeps them fresh enough
+_role_members_cache = TTLCache(maxsize=16, ttl=60)
+_role_members_lock = Lock()
+
+# Guard against cycles when walking the users hierarchy
+_MAX_HIERARCHY_DEPTH = 32
+
 class AssignmentResponse(BaseModel):
     """
     Represents the response of an assignment operation.
@@ -69,6 +91,7 @@ def create_user(user_payload: CreateUser) -> dict | None:
                 "role_id": user.role_id
             }
             session.close()
+            invalidate_role_members(response["role_id"])
             return response
     except Exception as e:
         logger.error(f"Error while creating user: {e}")
@@ -95,12 +118,25 @@ def change_user_status(user_id: int, is_active: bool) -> User | None:
             session.commit()
             session.refresh(user)
             session.close()
+            invalidate_cached_user(user.username)
             return user
     except Exception as e:
         print(f"Error changing user status ({user_id}): {e}")
     return None
 
 
+def _children_count_subquery():
+    """
+    Builds a correlated subquery counting the children of each selected user.
+
+    Returns:
+        ScalarSelect: The subquery, to be added as a column of a User query.
+    """
+    return select(func.count(UsersGroup.id)).where(
+        UsersGroup.parent_id == User.id
+    ).correlate(User).scalar_subquery()
+
+
 def get_users_with_filters(term: str = "", page: int = 1, limit: int = 10) -> dict | None:
     """
     Retrieves a list of users with filters.
@@ -124,8 +160,12 @@ def get_users_with_filters(term: str = "", page: int = 1, limit: int = 10) -> di
                     User.full_name.like(f"%{term}%")
                 ))
             count = session.execute(users_query.with_only_columns(func.count(User.id))).scalar_one()
-            users_query = users_query.order_by(User.id).offset(offset).limit(limit)
-            users = session.execute(users_query).scalars().all()
+            users_query = users_query.add_columns(
+                _children_count_subquery().label("children_count")
+            ).order_by(User.id).offset(offset).limit(limit)
+            users = session.execute(users_query)
+            role_codes = get_role_codes()
+            state_codes = get_state_codes()
             response = {
                 "data": [{
                     "id": user.id,
@@ -133,11 +173,11 @@ def get_users_with_filters(term: str = "", page: int = 1, limit: int = 10) -> di
                     "full_name": user.full_name,
                     "email": user.email,
                     "role_id": user.role_id,
-                    "role": user.role.code,
-                    "state": user.state.code if user.state else None,
+                    "role": role_codes.get(user.role_id),
+                    "state": state_codes.get(user.state_id),
                     "status": StatusEnum.ACTIVE if user.is_active else StatusEnum.INACTIVE,
-                    "children_count": len(user.associations_as_parent)
-                } for user in users],
+                    "children_count": children_count
+                } for user, children_count in users],
                 "total": count,
                 "per_page": limit,
                 "current_page": page,
@@ -199,8 +239,11 @@ def get_logs_with_filters(
                     UserLogs.created_at <= end_date_utc
                 )
             count = session.execute(logs_query.with_only_columns(func.count(UserLogs.id))).scalar_one()
-            logs_query = logs_query.order_by(-UserLogs.id).offset(offset).limit(limit)
-            logs = session.execute(logs_query).scalars().all()
+            logs_query = logs_query.options(
+                contains_eager(UserLogs.user), joinedload(UserLogs.type)
+            ).order_by(-UserLogs.id).offset(offset).limit(limit)
+            logs = session.execute(logs_query).scalars()
+            role_codes = get_role_codes()
             response = {
                 "data": [{
                     "id": log.id,
@@ -211,7 +254,7 @@ def get_logs_with_filters(
                         "full_name": log.user.full_name,
                         "email": log.user.email,
                         "role_id": log.user.role_id,
-                        "role": log.user.role.code
+                        "role": role_codes.get(log.user.role_id)
                     },
                     "event_type_id": log.event_type,
                     "event_type": log.type,
@@ -248,6 +291,7 @@ def get_user_children(parent_id: int) -> list[dict] | None:
             if user is None:
                 return None
             user_relations = session.query(UsersGroup).filter(UsersGroup.parent_id == parent_id).all()
+            role_codes = get_role_codes()
             response = [{
                 "parent_id": assoc.parent_id,
                 "child_id": assoc.child_id,
@@ -256,7 +300,7 @@ def get_user_children(parent_id: int) -> list[dict] | None:
                     "full_name": assoc.child.full_name,
                     "email": assoc.child.email,
                     "role_id": assoc.child.role_id,
-                    "role": assoc.child.role.code,
+                    "role": role_codes.get(assoc.child.role_id),
                     "status": StatusEnum.ACTIVE if assoc.child.is_active else StatusEnum.INACTIVE,
                     "children_count": len(assoc.child.associations_as_parent)
                 },
@@ -275,6 +319,8 @@ def create_users_relation(parent_id: int, child_id: int) -> dict | None:
     """
     Creates a relation between two users.
 
+    Both users must exist; callers check it beforehand with get_existing_user_ids.
+
     Args:
         parent_id (int): The ID of the parent user.
         child_id (int): The ID of the child user.
@@ -284,12 +330,6 @@ def create_users_relation(parent_id: int, child_id: int) -> dict | None:
     """
     try:
         with closing(next(get_session('multiagent'))) as session:
-            parent = session.query(User).filter(User.id == parent_id).first()
-            if not parent:
-                return None
-            child = session.query(User).filter(User.id == child_id).first()
-            if not child:
-                return None
             # Check if child already has a parent
             child_parent_relation = session.query(UsersGroup).filter(
                 UsersGroup.child_id == child_id
@@ -299,8 +339,8 @@ def create_users_relation(parent_id: int, child_id: int) -> dict | None:
                 logger.error(f"Cannot create relation between {parent_id} and {child_id}. User {child_id} is subordinate of {child_parent_relation.parent_id}")
                 return None
             users_group = UsersGroup(
-                parent_id=parent.id,
-                child_id=child.id,
+                parent_id=parent_id,
+                child_id=child_id,
                 is_active=True
             )
             session.add(users_group)
@@ -357,6 +397,40 @@ def get_user_by_username(username: str) -> User | None:
     return None
 
 
+def get_cached_user_by_username(username: str) -> User | None:
+    """
+    Retrieves a user by their username, reusing recent lookups.
+
+    Entries live for 30 seconds and are dropped as soon as the user's status,
+    state or password changes through this module.
+
+    Args:
+        username (str): The username of the user to retrieve.
+
+    Returns:
+        User | None: The user with the specified username, or None if not found.
+    """
+    with _users_cache_lock:
+        user = _users_cache.get(username)
+    if user is None:
+        user = get_user_by_username(username)
+        if user is not None:
+            with _users_cache_lock:
+                _users_cache[username] = user
+    return user
+
+
+def invalidate_cached_user(username: str) -> None:
+    """
+    Drops a user from the lookup cache used by get_cached_user_by_username.
+
+    Args:
+        username (str): The username of the user to drop.
+    """
+    with _users_cache_lock:
+        _users_cache.pop(username, None)
+
+
 def get_user_by_email(email: str) -> User | None:
     """
     Retrieves a user by their email.
@@ -377,6 +451,28 @@ def get_user_by_email(email: str) -> User | None:
     return None
 
 
+def get_existing_user_ids(user_ids: list[int]) -> set[int] | None:
+    """
+    Retrieves which of the given user IDs exist, using a single query.
+
+    Args:
+        user_ids (list[int]): The IDs of the users to look up.
+
+    Returns:
+        set[int] | None: The subset of IDs that exist, or None if an error occurs.
+    """
+    try:
+        with closing(next(get_session('multiagent'))) as session:
+            existing_ids = session.execute(
+                select(User.id).filter(User.id.in_(user_ids))
+            ).scalars().all()
+            session.close()
+            return set(existing_ids)
+    except Exception as e:
+        logger.error(f"Error getting existing users: {e}")
+    return None
+
+
 def get_user_ancestors(user_id: int) -> list[int] | None:
     """
     Retrieves a list of user IDs representing the ancestors of a given user.
@@ -389,21 +485,87 @@ def get_user_ancestors(user_id: int) -> list[int] | None:
     """
     try:
         with closing(next(get_session('multiagent'))) as session:
-            user = session.query(User).filter(User.id == user_id).first()
-            if user is None:
-                session.close()
-                return None
-            ancestors = []
-            while user.associations_as_child:
-                user = user.associations_as_child[0].parent
-                ancestors.append(user.id)
+            # Walk up the hierarchy in a single recursive query, nearest ancestor first
+            ancestors = select(
+                UsersGroup.parent_id.label("id"), literal_column("1").label("depth")
+            ).where(UsersGroup.child_id == user_id).cte("ancestors", recursive=True)
+            ancestors = ancestors.union_all(
+                select(UsersGroup.parent_id, ancestors.c.depth + literal_column("1")).where(
+                    UsersGroup.child_id == ancestors.c.id,
+                    ancestors.c.depth < _MAX_HIERARCHY_DEPTH
+                )
+            )
+            ancestor_ids = session.execute(
+                select(ancestors.c.id).order_by(ancestors.c.depth)
+            ).scalars().all()
             session.close()
-            return ancestors
+            return list(ancestor_ids)
     except Exception as e:
         print(f"Error getting user ancestors: {e}")
     return None
 
 
+def get_role_member_ids(role_id: int) -> frozenset[int] | None:
+    """
+    Retrieves the IDs of the users with a given role, reusing recent lookups.
+
+    Entries live for 60 seconds and are dropped as soon as a user with that
+    role is created through this module.
+
+    Args:
+        role_id (int): The ID of the role.
+
+    Returns:
+        frozenset[int] | None: The IDs of the users with the role, or None if an error occurs.
+    """
+    with _role_members_lock:
+        member_ids = _role_members_cache.get(role_id)
+    if member_ids is not None:
+        return member_ids
+    try:
+        with closing(next(get_session('multiagent'))) as session:
+            member_ids = frozenset(session.execute(
+                select(User.id).where(User.role_id == role_id)
+            ).scalars().all())
+            session.close()
+    except Exception as e:
+        logger.error(f"Error getting users with role {role_id}: {e}")
+        return None
+    with _role_members_lock:
+        _role_members_cache[role_id] = member_ids
+    return member_ids
+
+
+def invalidate_role_members(role_id: int) -> None:
+    """
+    Drops a role from the cache used by get_role_member_ids.
+
+    Args:
+        role_id (int): The ID of the role to drop.
+    """
+    with _role_members_lock:
+        _role_members_cache.pop(role_id, None)
+
+
+def get_notification_recipients(user_id: int | None, role_id: int) -> set[int] | None:
+    """
+    Retrieves the IDs of the users to notify about a conversation: the ancestors
+    of its assigned user and every user with the given role.
+
+    Args:
+        user_id (int | None): The ID of the user assigned to the conversation.
+        role_id (int): The ID of the role whose users are always notified.
+
+    Returns:
+        set[int] | None: The IDs of the users to notify, or None if an error occurs.
+    """
+    role_member_ids = get_role_member_ids(role_id)
+    ancestor_ids = get_user_ancestors(user_id) if user_id else []
+    if role_member_ids is None or ancestor_ids is None:
+        return None
+    return {*role_member_ids, *ancestor_ids}
+
+
 def get_user_descendants(user_id: int) -> list[int] | None:
     """
     Retrieves a list of user IDs representing the descendants of a given user.
@@ -442,18 +604,56 @@ def get_user_descendants(user_id: int) -> list[int] | None:
     return None
 
 
+def _get_catalog(model: type[UserRole] | type[UserState]) -> dict[int, str]:
+    """
+    Retrieves a cached mapping of IDs to codes for a catalog table.
+
+    Args:
+        model (type[UserRole] | type[UserState]): The catalog model to load.
+
+    Returns:
+        dict[int, str]: The codes of the catalog, indexed by ID.
+    """
+    with _catalogs_lock:
+        catalog = _catalogs_cache.get(model.__tablename__)
+        if catalog is None:
+            with closing(next(get_session('multiagent'))) as session:
+                rows = session.execute(select(model.id, model.code)).all()
+                session.close()
+            catalog = {row.id: row.code for row in rows}
+            _catalogs_cache[model.__tablename__] = catalog
+        return catalog
+
+
+def get_role_codes() -> dict[int, str]:
+    """
+    Retrieves the code of every user role, indexed by role ID.
+
+    Returns:
+        dict[int, str]: The role codes, refreshed every five minutes.
+    """
+    return _get_catalog(UserRole)
+
+
+def get_state_codes() -> dict[int, str]:
+    """
+    Retrieves the code of every user state, indexed by state ID.
+
+    Returns:
+        dict[int, str]: The state codes, refreshed every five minutes.
+    """
+    return _get_catalog(UserState)
+
+
 def get_all_user_states() -> list[dict] | None:
     """
     Retrieves a list of all user states.
 
     Returns:
-        list[UserState] | None: A list of all user states, or None if an error occurs.
+        list[dict] | None: A list of all user states, or None if an error occurs.
     """
     try:
-        with closing(next(get_session('multiagent'))) as session:
-            user_states = session.query(UserState).all()
-            session.close()
-            return [state.to_dict() for state in user_states]
+        return [{"id": id, "code": code} for id, code in get_state_codes().items()]
     except Exception as e:
         logger.error(f"Error getting user states: {e}")
     return None
@@ -464,13 +664,10 @@ def get_all_users_roles() -> list[dict] | None:
     Retrieves a list of all user roles.
 
     Returns:
-        list[UserRole] | None: A list of all user roles, or None if an error occurs.
+        list[dict] | None: A list of all user roles, or None if an error occurs.
     """
     try:
-        with closing(next(get_session('multiagent'))) as session:
-            user_roles = session.query(UserRole).all()
-            session.close()
-            return [role.to_dict() for role in user_roles]
+        return [{"id": id, "code": code} for id, code in get_role_codes().items()]
     except Exception as e:
         logger.error(f"Error while getting users roles: {e}")
     return None
@@ -486,6 +683,7 @@ def activate_user_account(user_id):
             session.commit()
             session.refresh(user)
             session.close()
+            invalidate_cached_user(user.username)
             return user
     except Exception as e:
         print(f"Error activating user account ({user_id}): {e}")
@@ -504,23 +702,27 @@ def change_user_state(user_id: int, state_id: int) -> User | None:
         User | None: The updated user, or None if an error occurs.
     """
     try:
+        state_code = get_state_codes().get(state_id)
+        if state_code is None:
+            return None
         with closing(next(get_session('multiagent'))) as session:
-            user = session.query(User).filter(User.id == user_id).first()
+            # Update and read back the user in a single round trip
+            user = session.execute(
+                update(User).where(User.id == user_id).values(state_id=state_id).returning(User)
+            ).scalar_one_or_none()
             if user is None:
+                session.rollback()
                 return None
-            state = session.query(UserState).filter(UserState.id == state_id).first()
-            if state is None:
-                return None
-            user.state = state
+            session.expunge(user)
             log = UserLogs(
                 user_id=user.id,
                 event_type=EventTypesEnum.STATE_CHANGE.value,
-                event_details=state.code
+                event_details=state_code
             )
             session.add(log)
             session.commit()
-            session.refresh(user)
             session.close()
+            invalidate_cached_user(user.username)
             return user
     except Exception as e:
         logger.error(f"Error changing user state ({user_id}): {e}")
@@ -547,6 +749,7 @@ def change_user_password(user_id: int, hashed_password: str) -> User | None:
             session.commit()
             session.refresh(user)
             session.close()
+            invalidate_cached_user(user.username)
             return user
     except Exception as e:
         logger.error(f"Error changing user password ({user_id}): {e}")
@@ -573,13 +776,14 @@ def get_all_users_by_role(role_id: int, user_id: int = None) -> list[dict]:
                     User.role_id == role_id, UsersGroup.parent_id == user_id, UsersGroup.is_active
                 ).order_by(User.id)
             users = session.execute(users_query).scalars().all()
+            role_codes = get_role_codes()
             response = [{
                 "id": user.id,
                 "username": user.username,
                 "full_name": user.full_name,
                 "email": user.email,
                 "role_id": user.role_id,
-                "role": user.role.code,
+                "role": role_codes.get(user.role_id),
                 "status": StatusEnum.ACTIVE if user.is_active else StatusEnum.INACTIVE,
                 "children_count": len(user.associations_as_parent)
             } for user in users]
@@ -808,25 +1012,19 @@ async def assign_conversation_to_agent(conversation_id: int, agent_id: int, curr
                 state_id=conversation.state_id
             )
 
-            users_to_notify = get_user_ancestors(agent_id)
-            admin_users = get_all_users_by_role(role_id=UserRoles.PRINCIPAL.value)
-            if users_to_notify:
-                users_to_notify = users_to_notify + [user['id'] for user in admin_users if user['id'] not in users_to_notify]
-            else:
-                users_to_notify = [user['id'] for user in admin_users]
+            users_to_notify = get_notification_recipients(agent_id, UserRoles.PRINCIPAL.value) or set()
             
-            if agent_id and agent_id not in users_to_notify:
-                users_to_notify.append(agent_id)
+            if agent_id:
+                users_to_notify.add(agent_id)
             
-            if agent_id != previous_agent_assigned and previous_agent_assigned:
-                users_to_notify.append(previous_agent_assigned)
+            if previous_agent_assigned:
+                users_to_notify.add(previous_agent_assigned)
             
-            for ancestor_id in users_to_notify:
-                # Notify assignment to agent, supervisor and administrators
-                await socket_manager.send_notification(ancestor_id, Notification(
-                    type=NotificationType.NEW_CONVERSATION if event_type == AssignmentTypeEnum.ASSIGNED.value else NotificationType.NEW_TRANSFER,
-                    conversation=conversation_data
-                ))
+            # Notify assignment to agent, supervisor and administrators
+            await socket_manager.broadcast(users_to_notify, Notification(
+                type=NotificationType.NEW_CONVERSATION if event_type == AssignmentTypeEnum.ASSIGNED.value else NotificationType.NEW_TRANSFER,
+                conversation=conversation_data
+            ))
             if event_type == AssignmentTypeEnum.TRANSFERRED.value:
                 log = UserLogs(
                     user_id=agent_id,
@@ -836,6 +1034,8 @@ async def assign_conversation_to_agent(conversation_id: int, agent_id: int, curr
                 session.add(log)
                 session.commit()
             if previous_agent_assigned is None:
+                # An agent took the conversation, so the client no longer needs the default message
+                await jobs.cancel(jobs.DEFAULT_MESSAGE_JOB, conversation.conversation_id)
                 await assing_agent_message(conversation.client_phone, agent.full_name)
             response = AssignmentResponse(
                 success=True,
@@ -3,6 +3,7 @@ import sentry_sdk
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 from app.config import settings
 from app.routers.conversations import conversations
 from app.routers.users import users
@@ -14,6 +15,10 @@ from app.routers.webhook import webhook
 from app.routers.templates import templates
 from app.routers.admin import admin
 from app.utilities.db import initialize_database
+from app.helpers import twilio
+from app.utilities.mailing import close_smtp_connection, start_email_worker, stop_email_worker
+from app.utilities.passwords import configure_password_hashing
+from app.utilities import jobs
 
 
 
@@ -21,9 +26,17 @@ from app.utilities.db import initialize_database
 async def lifespan(app: FastAPI):
     try:
         initialize_database()
+        configure_password_hashing()
+        twilio.start_outbound_workers()
+        jobs.start_job_poller()
+        start_email_worker()
         yield
     finally:
-        pass
+        await jobs.stop_job_poller()
+        await twilio.stop_outbound_workers()
+        await twilio.close_client()
+        await stop_email_worker()
+        close_smtp_connection()
 
 
 if settings.environment != "development":
@@ -47,7 +60,8 @@ app = FastAPI(
     description="RESTful API for multiagent project",
     version="0.1.0",
     root_path=settings.root_path,
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -134,4 +148,6 @@ if __name__ == '__main__':
         port=5001,
         log_level="info",
         reload=True,
+        ws_ping_interval=20,
+        ws_ping_timeout=20,
     )
\ No newline at end of file
@@ -2,7 +2,8 @@ from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, Enum
 from sqlalchemy.orm import relationship
 from sqlalchemy.orm import Mapped
 from sqlalchemy.sql import func
-from typing import List
+from pydantic import BaseModel, ConfigDict
+from typing import List, Optional
 import enum
 
 from app.utilities.db import Base
@@ -116,4 +117,30 @@ class Conversation(Base):
             "last_message": self.last_message,
             "created_at": self.created_at,
             "updated_at": self.updated_at,
-            }
\ No newline at end of file
+            }
+
+
+class TransferConversation(BaseModel):
+    """
+    A model representing the data required to transfer a conversation.
+
+    Attributes:
+        user_id (int): The ID of the agent the conversation is transferred to.
+    """
+    user_id: int
+
+
+class EndConversation(BaseModel):
+    """
+    A model representing the typification sent when a conversation is ended.
+
+    Attributes:
+        motive (Optional[str]): The reason the conversation was ended.
+        filteredSubcategorias (Optional[str]): The selected subcategories, stored as the typification comment.
+        client_id (Optional[str]): The client's document number.
+    """
+    model_config = ConfigDict(coerce_numbers_to_str=True)
+
+    motive: Optional[str] = None
+    filteredSubcategorias: Optional[str] = ""
+    client_id: Optional[str] = None
@@ -20,6 +20,20 @@ class SenderTypeEnum(enum.Enum):
     CLIENT = 3
 
 
+class MessageStatusEnum(enum.Enum):
+    """
+    Enum representing the delivery status of a message.
+
+    Attributes:
+        PENDING (str): The message is waiting to be delivered to the client.
+        SENT (str): The message was delivered to the client.
+        FAILED (str): The message could not be delivered to the client.
+    """
+    PENDING = "pending"
+    SENT = "sent"
+    FAILED = "failed"
+
+
 class Message(Base):
     """
     Represents a message in the database.
@@ -32,6 +46,7 @@ class Message(Base):
         sender_type (SenderTypeEnum): The type of sender.
         user_id (int): The identifier of the user who sent the message (optional).
         message_media_id (int): The identifier of the media attached to the message (optional).
+        status (MessageStatusEnum): The delivery status of the message (optional, NULL means sent).
 
     Relationships:
         message_media (MessageMedia): The media attached to the message (optional).
@@ -47,6 +62,7 @@ class Message(Base):
     sender_type = Column("remitente", Enum(SenderTypeEnum))
     user_id = Column("usuario_id", Integer, ForeignKey('tbl_usuarios.usuario_id'), nullable=True)
     message_media_id = Column("archivo_id", Integer, ForeignKey('tbl_archivos_adjuntos.archivo_id'))
+    status = Column("estado_envio", Enum(MessageStatusEnum), nullable=True)
 
     # Relación con archivo (opcional)
     message_media = relationship("MessageMedia")
@@ -7,18 +7,19 @@ from sqlalchemy.sql import func
 
 from typing import List, Literal, Optional
 
+from app.config import settings
 from app.utilities.db import Base
 from app.models.assignment import Assignment
 from app.models.template import Template
 
-from pydantic import BaseModel
+from pydantic import BaseModel, EmailStr, Field
 
 
 child_relationship_kwargs = dict(foreign_keys="UsersGroup.child_id")
 parent_relationship_kwargs = dict(foreign_keys="UsersGroup.parent_id")
 
 
-class UserRoleEnum(enum.Enum):
+class UserRoleEnum(enum.IntEnum):
     """Roles allowed for users in the platform.
 
     AGENT: Agent role.
@@ -35,7 +36,7 @@ class UserRoleEnum(enum.Enum):
     AUDIT = 7
 
 
-class UserStateEnum(enum.Enum):
+class UserStateEnum(enum.IntEnum):
     """States for users in the platform.
 
     ONLINE: User is online.
@@ -97,11 +98,11 @@ class CreateUser(BaseModel):
         role_id (int): The ID of the role assigned to the user.
         parent_id (Optional[int]): The ID of the parent user (optional).
     """
-    username: str
-    full_name: str
-    email: str
-    role_id: int
-    parent_id: Optional[int] = None
+    username: str = Field(min_length=3, max_length=64, pattern=r"^[A-Za-z0-9_.-]+$")
+    full_name: str = Field(min_length=1, max_length=128)
+    email: EmailStr = Field(max_length=254)
+    role_id: int = Field(ge=min(UserRoleEnum), le=max(UserRoleEnum))
+    parent_id: Optional[int] = Field(default=None, ge=1)
 
 
 class StatusEnum(str, enum.Enum):
@@ -129,6 +130,28 @@ class UpdateUserStatus(BaseModel):
     ]
 
 
+class UpdateUserState(BaseModel):
+    """
+    A model representing the data required to update a user's state.
+
+    Attributes:
+        state_id (int): The ID of the new state of the user.
+    """
+    state_id: int
+
+
+class UsersByRole(BaseModel):
+    """
+    A model representing the filters used to list users by role.
+
+    Attributes:
+        role_id (int): The ID of the role to filter users by.
+        user_id (Optional[int]): The ID of the parent user to filter users by (optional).
+    """
+    role_id: int
+    user_id: Optional[int] = None
+
+
 class CreateUsersRelation(BaseModel):
     """
     A model representing the data required to create a new users relation.
@@ -184,7 +207,7 @@ class User(Base):
     created_at = Column("fecha_creacion", DateTime, default=func.now())
     updated_at = Column("fecha_actualizacion", DateTime, default=func.now(), onupdate=func.now())
 
-    role = relationship("UserRole", lazy='selectin')
+    role = relationship("UserRole")
     state = relationship("UserState")
     
     assignments: Mapped[List["Assignment"]] = relationship(back_populates="user")
@@ -203,7 +226,7 @@ class User(Base):
         Returns:
             None
         """
-        salt = bcrypt.gensalt()  # Generates a random salt
+        salt = bcrypt.gensalt(settings.bcrypt_rounds)  # Generates a random salt
         self.password = bcrypt.hashpw(password.encode('utf-8'),
                                       salt).decode('utf-8')  # Saves the hash
 
@@ -251,7 +274,7 @@ class UsersGroup(Base):
     child = relationship("User", back_populates='associations_as_child', **child_relationship_kwargs)
 
 
-class EventTypesEnum(enum.Enum):
+class EventTypesEnum(enum.IntEnum):
     """Event types for users in the platform.
 
     Attributes:
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field, field_serializer
+from pydantic import BaseModel, ConfigDict, Field, field_serializer
 from enum import Enum
 from typing import Literal, Optional
 from datetime import datetime
@@ -48,6 +48,8 @@ class ConversationData(BaseModel):
         state_id (int): State ID.
         previous_user (Optional[int]): Previous user ID.
     """
+    model_config = ConfigDict(frozen=True)
+
     id: int = Field(...)
     client_phone: str = Field(...)
     last_message: str = Field(...)
@@ -88,6 +90,8 @@ class MessageData(BaseModel):
         attachment_name (Optional[str]): Attachment name.
         sender_type (Literal[SenderType.AGENT, SenderType.CHATBOT, SenderType.CLIENT]): Sender type.
     """
+    model_config = ConfigDict(frozen=True)
+
     content: str = Field(...)
     conversation_id: int = Field(...)
     created_at: datetime = Field(...)
@@ -127,6 +131,8 @@ class StatusData(BaseModel):
         success (bool): Success status.
         message (str): Status message.
     """
+    model_config = ConfigDict(frozen=True)
+
     success: bool = Field(...)
     message: str = Field(...)
 
@@ -140,6 +146,8 @@ class Notification(BaseModel):
         conversation (Optional[ConversationData]): Conversation data.
         message (Optional[MessageData]): Message data.
     """
+    model_config = ConfigDict(frozen=True)
+
     type: Literal[
         NotificationType.NEW_CONVERSATION,
         NotificationType.NEW_TRANSFER,
@@ -172,6 +180,8 @@ class ChatWebSocketResponse(BaseModel):
         status (Optional[StatusData]): Status data.
         message (Optional[MessageData]): Message data.
     """
+    model_config = ConfigDict(frozen=True)
+
     type: Literal[
         ChatWebSocketResponseType.MESSAGE,
         ChatWebSocketResponseType.STATUS
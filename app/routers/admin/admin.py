@@ -1,16 +1,24 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Request, status, Query
+from fastapi import APIRouter, HTTPException, Request, status, Query
 from app.helpers import users
-from app.models.user import CreateUser, UserRoleEnum, UpdateUserStatus, CreateUsersRelation
-from app.utilities.logger import logger
-from app.utilities.mailing import send_account_activation_email
+from app.models.user import CreateUser, UserRoleEnum, UpdateUserStatus, CreateUsersRelation, StatusEnum
+from app.utilities.mailing import enqueue_account_activation_email
 from app.routers.auth import auth
-from app.config import settings
-from datetime import datetime, timedelta
+from datetime import datetime
 from typing import Optional
 
 import pytz
 
 
+ADMIN_PANEL_ROLES = frozenset({
+    UserRoleEnum.ADMIN,
+    UserRoleEnum.PRINCIPAL,
+    UserRoleEnum.SUPERVISOR,
+    UserRoleEnum.SUPPORT,
+    UserRoleEnum.DATA_SECURITY,
+    UserRoleEnum.AUDIT
+})
+
+
 async def check_if_user_is_admin(request: Request) -> bool:
     """
     Checks if the current user has admin privileges.
@@ -24,6 +32,8 @@ async def check_if_user_is_admin(request: Request) -> bool:
     Raises:
     HTTPException: If the user is not authenticated or does not have admin privileges.
     """
+    if getattr(request.state, "is_admin", False):
+        return True
     privileges_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="User does not have enough privileges",
@@ -31,15 +41,9 @@ async def check_if_user_is_admin(request: Request) -> bool:
     user = request.state.current_user
     if not user:
         raise privileges_exception
-    if user.role_id not in [
-        UserRoleEnum.ADMIN.value,
-        UserRoleEnum.PRINCIPAL.value,
-        UserRoleEnum.SUPERVISOR.value,
-        UserRoleEnum.SUPPORT.value,
-        UserRoleEnum.DATA_SECURITY.value,
-        UserRoleEnum.AUDIT.value
-    ]:
+    if user.role_id not in ADMIN_PANEL_ROLES:
         raise privileges_exception
+    request.state.is_admin = True
     return True
 
 router = APIRouter()
@@ -97,12 +101,11 @@ async def get_logs(
 
 
 @router.post("/users", status_code=200)
-async def create_user(tasks: BackgroundTasks, user_payload: CreateUser):
+async def create_user(user_payload: CreateUser):
     """
     Creates a new user based on the provided payload.
 
     Args:
-    tasks (BackgroundTasks): The background tasks to run after creating the user.
     user_payload (CreateUser): The payload containing the user's data.
 
     Returns:
@@ -119,12 +122,8 @@ async def create_user(tasks: BackgroundTasks, user_payload: CreateUser):
     user = users.create_user(user_payload)
     if not user:
         raise HTTPException(status_code=500, detail="Error while creating user")
-    activation_token_expires = timedelta(minutes=settings.jwt_reset_expiration)
-    activation_token = auth.create_reset_token(
-        data={"sub": user["username"]}, expires_delta=activation_token_expires
-    )
-    logger.info(f"Activation token: {activation_token}")
-    tasks.add_task(send_account_activation_email, user["email"], activation_token)
+    activation_token = auth.create_reset_token(data={"sub": user["username"]})
+    enqueue_account_activation_email(user["email"], activation_token)
     return user
 
 
@@ -148,7 +147,7 @@ async def change_user_status(id: int, payload: UpdateUserStatus):
         raise HTTPException(status_code=400, detail="User does not exist")
     if not user.password:
         raise HTTPException(status_code=400, detail="Account has not been configured yet")
-    is_active = True if payload.status == "active" else False
+    is_active = payload.status is StatusEnum.ACTIVE
     user = users.change_user_status(id, is_active)
     if not user:
         raise HTTPException(status_code=500, detail="Error while changing user status")
@@ -196,9 +195,12 @@ async def create_parent_child_relation(parent_id: int, payload: CreateUsersRelat
     Raises:
     HTTPException: If the parent or child user does not exist.
     """
-    if not users.get_user_by_id(parent_id):
+    existing_ids = users.get_existing_user_ids([parent_id, payload.child_id])
+    if existing_ids is None:
+        raise HTTPException(status_code=500, detail="Error while creating relation")
+    if parent_id not in existing_ids:
         raise HTTPException(status_code=400, detail="Parent user does not exist")
-    if not users.get_user_by_id(payload.child_id):
+    if payload.child_id not in existing_ids:
         raise HTTPException(status_code=400, detail="Child user does not exist")
     relation = users.create_users_relation(parent_id, payload.child_id)
     if not relation:
@@ -1,25 +1,32 @@
-from datetime import datetime, timedelta, timezone
+from datetime import timedelta
+from functools import partial
 from typing import Annotated, Optional
 
 import jwt
+import time
+from cachetools import TTLCache
+from threading import Lock
 from fastapi import APIRouter, Depends, HTTPException, status, Request, Form, BackgroundTasks
 from fastapi.security import OAuth2PasswordRequestForm
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response
+from fastapi.concurrency import run_in_threadpool
 from jwt.exceptions import InvalidTokenError
-from passlib.context import CryptContext
 from pydantic import BaseModel
 
 from app.config import settings
 from app.helpers import conversations
 from app.models.user import UserStateEnum, User, UserRoleEnum
 from app.utilities.logger import logger
-from app.utilities.mailing import send_password_reset_email
+from app.utilities.mailing import enqueue_password_reset_email
+from app.utilities.passwords import get_password_hash, verify_password
 from app.helpers.users import (
     get_user_by_username,
+    get_cached_user_by_username,
     get_user_by_email,
     change_user_state,
     change_user_password,
-    activate_user_account
+    activate_user_account,
+    get_role_codes
 )
 
 # to get a string like this run:
@@ -93,36 +100,33 @@ class ForgotUsernameResponse(BaseModel):
     username: Optional[str] = None
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-router = APIRouter()
+# Usernames whose account was checked against the database during the last
+# minute; refreshes inside that window trust the claims of the refresh token
+_verified_refresh_users = TTLCache(maxsize=4096, ttl=60)
+_verified_refresh_users_lock = Lock()
 
+# Signing keys, encoded once instead of on every encode/decode call
+_ACCESS_KEY = settings.jwt_secret_key.encode("utf-8")
+_REFRESH_KEY = settings.jwt_refresh_secret_key.encode("utf-8")
+_RESET_KEY = settings.jwt_reset_secret_key.encode("utf-8")
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
-    """
-    Verifies a plain password against a hashed password.
+# Decoder shared by every token check; all our tokens carry a subject and an expiry
+_JWT = jwt.PyJWT(options={"require": ["exp", "sub"], "verify_aud": False})
+_ALGORITHMS = [settings.jwt_algorithm]
 
-    Args:
-    plain_password (str): The plain password to verify.
-    hashed_password (str): The hashed password to verify against.
-
-    Returns:
-    bool: Whether the plain password matches the hashed password.
-    """
-    return pwd_context.verify(plain_password, hashed_password)
+# Roles allowed to log in even when their account is inactive
+_PRIVILEGED_ROLE_IDS = frozenset({
+    UserRoleEnum.ADMIN,
+    UserRoleEnum.SUPPORT,
+    UserRoleEnum.DATA_SECURITY,
+    UserRoleEnum.AUDIT
+})
 
+ACCESS_TOKEN_EXPIRES = timedelta(minutes=settings.jwt_expiration)
+REFRESH_TOKEN_EXPIRES = timedelta(minutes=settings.jwt_refresh_expiration)
+RESET_TOKEN_EXPIRES = timedelta(minutes=settings.jwt_reset_expiration)
 
-def get_password_hash(password: str) -> str:
-    """
-    Generates a hashed password from a plain password.
-
-    Args:
-    password (str): The plain password to hash.
-
-    Returns:
-    str: The hashed password.
-    """
-    return pwd_context.hash(password)
+router = APIRouter()
 
 
 def authenticate_user(username: str, password: str) -> User | None:
@@ -137,7 +141,6 @@ def authenticate_user(username: str, password: str) -> User | None:
     User | None: The authenticated user, or None if authentication fails.
     """
     user = get_user_by_username(username)
-    print(user)
     if not user:
         return None
     if not verify_password(password, user.password):
@@ -145,67 +148,26 @@ def authenticate_user(username: str, password: str) -> User | None:
     return user
 
 
-def create_access_token(data: dict, expires_delta: timedelta | None = None) -> str:
-    """
-    Creates an access token with the given data and expiration delta.
-
-    Args:
-    data (dict): The data to encode in the token.
-    expires_delta (timedelta | None): The expiration delta for the token. Defaults to 15 minutes.
-
-    Returns:
-    str: The created access token.
-    """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.jwt_secret_key, algorithm=settings.jwt_algorithm)
-    return encoded_jwt
-
-
-def create_refresh_token(data: dict, expires_delta: timedelta | None = None) -> str:
+def _create_token(data: dict, key: bytes, expires_delta: timedelta | None = None) -> str:
     """
-    Creates a refresh token with the given data and expiration delta.
+    Creates a signed token with the given data, key and expiration delta.
 
     Args:
     data (dict): The data to encode in the token.
+    key (bytes): The key used to sign the token.
     expires_delta (timedelta | None): The expiration delta for the token. Defaults to 15 minutes.
 
     Returns:
-    str: The created refresh token.
-    """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.jwt_refresh_secret_key, algorithm=settings.jwt_algorithm)
-    return encoded_jwt
-
-
-def create_reset_token(data: dict, expires_delta: timedelta | None = None) -> str:
+    str: The created token.
     """
-    Creates a reset token with the given data and expiration delta.
+    ttl = int(expires_delta.total_seconds()) if expires_delta else 900
+    return jwt.encode({**data, "exp": int(time.time()) + ttl}, key, algorithm=settings.jwt_algorithm)
 
-    Args:
-    data (dict): The data to encode in the token.
-    expires_delta (timedelta | None): The expiration delta for the token. Defaults to 15 minutes.
 
-    Returns:
-    str: The created reset token.
-    """
-    to_encode = data.copy()
-    if expires_delta:
-        expire = datetime.now(timezone.utc) + expires_delta
-    else:
-        expire = datetime.now(timezone.utc) + timedelta(minutes=15)
-    to_encode.update({"exp": expire})
-    encoded_jwt = jwt.encode(to_encode, settings.jwt_reset_secret_key, algorithm=settings.jwt_algorithm)
-    return encoded_jwt
+# Token creators, each bound to its own signing key and default lifetime
+create_access_token = partial(_create_token, key=_ACCESS_KEY, expires_delta=ACCESS_TOKEN_EXPIRES)
+create_refresh_token = partial(_create_token, key=_REFRESH_KEY, expires_delta=REFRESH_TOKEN_EXPIRES)
+create_reset_token = partial(_create_token, key=_RESET_KEY, expires_delta=RESET_TOKEN_EXPIRES)
 
 
 async def get_current_user(request: Request) -> User:
@@ -227,13 +189,13 @@ async def get_current_user(request: Request) -> User:
     if not token:
         raise credentials_exception
     try:
-        payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+        payload = _JWT.decode(token, _ACCESS_KEY, algorithms=_ALGORITHMS)
         username: str = payload.get("sub")
         if username is None:
             raise credentials_exception
     except InvalidTokenError:
         raise credentials_exception
-    user = get_user_by_username(username)
+    user = get_cached_user_by_username(username)
     if user is None:
         raise credentials_exception
     request.state.current_user = user
@@ -242,12 +204,14 @@ async def get_current_user(request: Request) -> User:
 
 @router.post("/login")
 async def login_for_access_token(
+    tasks: BackgroundTasks,
     form_data: Annotated[OAuth2PasswordRequestForm, Depends()],
 ) -> LoginResponse:
     """
     Handles a login request.
 
     Args:
+    tasks (BackgroundTasks): The tasks to run in the background.
     form_data (OAuth2PasswordRequestForm): The login form data.
 
     Returns:
@@ -257,50 +221,42 @@ async def login_for_access_token(
     HTTPException: If the username or password is incorrect.
     HTTPException: If an error occurs while changing the user's state.
     """
-    user = authenticate_user(form_data.username, form_data.password)
+    user = await run_in_threadpool(authenticate_user, form_data.username, form_data.password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect username or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    if not user.is_active and user.role_id not in [
-        UserRoleEnum.ADMIN.value,
-        UserRoleEnum.SUPPORT.value,
-        UserRoleEnum.DATA_SECURITY.value,
-        UserRoleEnum.AUDIT.value
-    ]:
+    if not user.is_active and user.role_id not in _PRIVILEGED_ROLE_IDS:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Account is inactive",
             headers={"WWW-Authenticate": "Bearer"},
         )
-    access_token_expires = timedelta(minutes=settings.jwt_expiration)
-    access_token = create_access_token(
-        data={"sub": form_data.username}, expires_delta=access_token_expires
-    )
-    refresh_token_expires = timedelta(minutes=settings.jwt_refresh_expiration)
+    access_token = create_access_token(data={"sub": form_data.username})
     refresh_token = create_refresh_token(
-        data={"sub": form_data.username}, expires_delta=refresh_token_expires
+        data={"sub": form_data.username, "role": user.role_id, "act": user.is_active}
     )
     user = change_user_state(user.id, UserStateEnum.ONLINE.value)
-    if user.role_id == UserRoleEnum.AGENT.value:
-        await conversations.massive_asignation()
     if not user:
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error changing user state to ONLINE"
         )
-    response = JSONResponse(LoginResponse(
+    if user.role_id == UserRoleEnum.AGENT.value:
+        # Hand pending conversations out once the response has been sent
+        tasks.add_task(conversations.massive_asignation)
+    response = Response(LoginResponse(
         user=UserData(
             id=user.id,
             username=form_data.username,
             full_name=user.full_name,
             email=user.email,
             role=user.role_id,
-            role_code=user.role.code
+            role_code=get_role_codes()[user.role_id]
         )
-    ).model_dump())
+    ).model_dump_json(), media_type="application/json")
     cookie_secure = True if settings.environment == 'production' else False
     response.set_cookie(
         key="access_token",
@@ -364,39 +320,44 @@ async def refresh_token(request: Request) -> RefreshResponse:
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Not authenticated"
             )
-        payload = jwt.decode(refresh_token, settings.jwt_refresh_secret_key, 
-                             algorithms=[settings.jwt_algorithm])
+        payload = _JWT.decode(refresh_token, _REFRESH_KEY, algorithms=_ALGORITHMS)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Invalid payload"
             )
-        user = get_user_by_username(username)
-        if user is None:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user"
-            )
-        if user.username != username:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Invalid user"
-            )
-        if not user.is_active and user.role_id != UserRoleEnum.ADMIN.value:
+        role_id = payload.get("role")
+        is_active = payload.get("act")
+        with _verified_refresh_users_lock:
+            recently_verified = username in _verified_refresh_users
+        if not recently_verified or role_id is None or is_active is None:
+            user = get_user_by_username(username)
+            if user is None:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid user"
+                )
+            if user.username != username:
+                raise HTTPException(
+                    status_code=status.HTTP_400_BAD_REQUEST,
+                    detail="Invalid user"
+                )
+            role_id, is_active = user.role_id, user.is_active
+        if not is_active and role_id != UserRoleEnum.ADMIN.value:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Account is inactive",
                 headers={"WWW-Authenticate": "Bearer"},
             )
-        access_token_expires = timedelta(minutes=settings.jwt_expiration)
-        access_token = create_access_token(
-            data={"sub": username}, expires_delta=access_token_expires
-        )
-        response = JSONResponse(RefreshResponse(
+        if not recently_verified:
+            with _verified_refresh_users_lock:
+                _verified_refresh_users[username] = True
+        access_token = create_access_token(data={"sub": username})
+        response = Response(RefreshResponse(
             success=True,
             message="Access token generated successfully"
-        ).model_dump())
+        ).model_dump_json(), media_type="application/json")
         cookie_secure = True if settings.environment == 'production' else False
         response.set_cookie(
             key="access_token",
@@ -414,12 +375,11 @@ async def refresh_token(request: Request) -> RefreshResponse:
 
 
 @router.post("/reset")
-async def reset_password(tasks: BackgroundTasks, email: str = Form(...)) -> ResetResponse:
+async def reset_password(email: str = Form(...)) -> ResetResponse:
     """
     Resets a user's password by sending a reset token to their email.
 
     Args:
-    tasks (BackgroundTasks): The tasks to run in the background.
     email (str): The email of the user to reset the password for.
 
     Returns:
@@ -434,12 +394,8 @@ async def reset_password(tasks: BackgroundTasks, email: str = Form(...)) -> Rese
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid user"
         )
-    reset_token_expires = timedelta(minutes=settings.jwt_reset_expiration)
-    reset_token = create_reset_token(
-        data={"sub": user.username}, expires_delta=reset_token_expires
-    )
-    logger.info(f"Reset token: {reset_token}")
-    tasks.add_task(send_password_reset_email, email, reset_token)
+    reset_token = create_reset_token(data={"sub": user.username})
+    enqueue_password_reset_email(email, reset_token)
     return ResetResponse(
         success=True,
         message="Reset token sent"
@@ -465,8 +421,7 @@ async def change_password(password: str = Form(...),
     HTTPException: If an error occurs while changing the user's password.
     """
     try:
-        payload = jwt.decode(reset_token, settings.jwt_reset_secret_key, 
-                             algorithms=[settings.jwt_algorithm])
+        payload = _JWT.decode(reset_token, _RESET_KEY, algorithms=_ALGORITHMS)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -480,7 +435,7 @@ async def change_password(password: str = Form(...),
                 detail="Invalid user"
             )
         
-        hashed_password = get_password_hash(password)
+        hashed_password = await run_in_threadpool(get_password_hash, password)
         user = change_user_password(user.id, hashed_password)
         if not user:
             raise HTTPException(
@@ -523,7 +478,7 @@ async def get_username(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid user"
         )
-    user = authenticate_user(user.username, password)
+    user = await run_in_threadpool(authenticate_user, user.username, password)
     if not user:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -540,8 +495,7 @@ async def get_username(
 async def activate_account(password: str = Form(...), 
                           activate_token: str = Form(...)) -> ResetResponse:
     try:
-        payload = jwt.decode(activate_token, settings.jwt_reset_secret_key, 
-                             algorithms=[settings.jwt_algorithm])
+        payload = _JWT.decode(activate_token, _RESET_KEY, algorithms=_ALGORITHMS)
         username: str = payload.get("sub")
         if username is None:
             raise HTTPException(
@@ -555,7 +509,7 @@ async def activate_account(password: str = Form(...),
                 detail="Invalid user"
             )
         
-        hashed_password = get_password_hash(password)
+        hashed_password = await run_in_threadpool(get_password_hash, password)
         user = change_user_password(user.id, hashed_password)
         if not user:
             raise HTTPException(
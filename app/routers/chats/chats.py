@@ -1,9 +1,9 @@
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect
 from app.helpers import conversations, messages, users as users_helper
 from app.utilities.logger import logger
-from app.helpers.twilio import send_message as send_msg_twilio
+from app.helpers.twilio import enqueue_message as enqueue_twilio_message
 from app.models.user import UserRoleEnum
-from app.models.message import Message, SenderTypeEnum
+from app.models.message import Message, MessageStatusEnum, SenderTypeEnum
 from app.models.conversation import ConversationStateEnum
 from app.models.websockets import (
     ChatWebSocketResponseType,
@@ -13,15 +13,44 @@ from app.models.websockets import (
     SenderType
 )
 from app.utilities.socket import socket_manager, WebSocketConfig, WebSocketType
-from datetime import datetime
 from app.config import settings
 
 
-import httpx
+from functools import partial
+
+import asyncio
 
 router = APIRouter()
 
 
+def _status_frame(success: bool, message: str) -> str:
+    """
+    Serializes a status frame for the chat websocket.
+
+    Args:
+    success (bool): Whether the operation succeeded.
+    message (str): The status message.
+
+    Returns:
+    str: The frame serialized as JSON.
+    """
+    return ChatWebSocketResponse(
+        type=ChatWebSocketResponseType.STATUS,
+        status=StatusData(success=success, message=message)
+    ).model_dump_json(exclude_none=True)
+
+
+# Status frames are constant, so they are serialized once at import
+_CONVERSATION_NOT_FOUND = _status_frame(False, "Conversation not found")
+_USER_NOT_FOUND = _status_frame(False, "User not found")
+_USER_NOT_ASSIGNED = _status_frame(False, "User is not assigned to this conversation")
+_CONVERSATION_CLOSED = _status_frame(False, "Conversation is closed")
+_MESSAGE_NOT_SAVED = _status_frame(False, "Error saving message")
+_TWILIO_ERROR = _status_frame(False, "Error sending message to client through Twilio")
+_MESSAGE_SENT = _status_frame(True, "Message sent")
+_MESSAGE_QUEUED = _status_frame(True, "Message queued")
+
+
 @router.post("/send")
 async def send_message(conversation_id: int, message: MessageData):
     """
@@ -37,9 +66,22 @@ async def send_message(conversation_id: int, message: MessageData):
     await socket_manager.send_message(conversation_id, message)
 
 
+async def confirm_message(message: Message):
+    """
+    Confirm a message by marking it as sent in the database.
+
+    Args:
+    message (Message): The message to be confirmed.
+
+    Returns:
+    None
+    """
+    await asyncio.to_thread(messages.mark_message_sent, message.id)
+
+
 async def rollback_message(message: Message, websocket: WebSocket):
     """
-    Rollback a message by deleting it from the database and sending an error response.
+    Rollback a message by marking it as failed in the database and sending an error response.
 
     Args:
     message (Message): The message to be rolled back.
@@ -48,24 +90,21 @@ async def rollback_message(message: Message, websocket: WebSocket):
     Returns:
     None
     """
-    # Delete message from database
-    messages.delete_message(message.id)
+    # Mark message as failed, which hides it from the conversation history
+    await asyncio.to_thread(messages.mark_message_failed, message.id)
     # Send error response
-    await websocket.send_json(ChatWebSocketResponse(
-        type=ChatWebSocketResponseType.STATUS,
-        status=StatusData(success=False, message="Error sending message to client through Twilio")
-    ).model_dump(exclude_none=True))
+    await websocket.send_text(_TWILIO_ERROR)
 
 
 @router.websocket("/{conversation_id}/ws")
-async def websocket_endpoint(websocket: WebSocket, conversation_id: int, user_id: str):
+async def websocket_endpoint(websocket: WebSocket, conversation_id: int, user_id: int):
     """
     Establish a WebSocket connection for a conversation.
 
     Args:
     websocket (WebSocket): The WebSocket connection.
     conversation_id (int): The ID of the conversation.
-    user_id (str): The ID of the user.
+    user_id (int): The ID of the user.
 
     Returns:
     None
@@ -75,41 +114,30 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, user_id
     # Get conversation by id
     conversation = conversations.get_conversation_by_id(conversation_id)
     if not conversation:
-        await websocket.send_json(ChatWebSocketResponse(
-            type=ChatWebSocketResponseType.STATUS,
-            status=StatusData(success=False, message="Conversation not found")
-        ).model_dump(exclude_none=True))
+        await websocket.send_text(_CONVERSATION_NOT_FOUND)
         await websocket.close()
         return
     user = users_helper.get_user_by_id(user_id)
     if not user:
-        await websocket.send_json(ChatWebSocketResponse(
-            type=ChatWebSocketResponseType.STATUS,
-            status=StatusData(success=False, message="User not found")
-        ).model_dump(exclude_none=True))
+        await websocket.send_text(_USER_NOT_FOUND)
         await websocket.close()
         return
     # Check if user is assigned to the conversation as an agent
     if conversation.assigned_user_id != user.id and user.role_id == UserRoleEnum.AGENT.value:
-        await websocket.send_json(ChatWebSocketResponse(
-            type=ChatWebSocketResponseType.STATUS,
-            status=StatusData(success=False, message="User is not assigned to this conversation")
-        ).model_dump(exclude_none=True))
+        await websocket.send_text(_USER_NOT_ASSIGNED)
         await websocket.close()
         return
     # Check if conversation is closed
     if conversation.state_id == ConversationStateEnum.CLOSED.value:
-        await websocket.send_json(ChatWebSocketResponse(
-            type=ChatWebSocketResponseType.STATUS,
-            status=StatusData(success=False, message="Conversation is closed")
-        ).model_dump(exclude_none=True))
+        await websocket.send_text(_CONVERSATION_CLOSED)
         await websocket.close()
         return
     # Add connection to socket manager
-    await socket_manager.add_connection(WebSocketConfig(
+    ws_config = WebSocketConfig(
         ws_type=WebSocketType.CONVERSATION,
         user_id=user_id, conversation_id=conversation_id
-    ), websocket)
+    )
+    await socket_manager.add_connection(ws_config, websocket)
     try:
         while True:
             agent_message = await websocket.receive_text()
@@ -118,61 +146,51 @@ async def websocket_endpoint(websocket: WebSocket, conversation_id: int, user_id
                 conversation_id=conversation_id,
                 content=agent_message,
                 sender_type=SenderTypeEnum.AGENT,
-                user_id=user_id
+                user_id=user_id,
+                status=MessageStatusEnum.SENT if settings.testing else MessageStatusEnum.PENDING
             )
-            # Save message in database
-            message, message_media = messages.save_message(message, conversation_id)
+            # Save message in database while looking up the users up in the hierarchy,
+            # both blocking queries run in worker threads so they overlap
+            async with asyncio.TaskGroup() as tg:
+                save_task = tg.create_task(
+                    asyncio.to_thread(messages.save_message, message, conversation_id)
+                )
+                ancestors_task = tg.create_task(
+                    asyncio.to_thread(users_helper.get_user_ancestors, conversation.assigned_user_id)
+                )
+            message, message_media = save_task.result()
             if not message:
-                logger.error("Error saving message: " + message)
-                await websocket.send_json(ChatWebSocketResponse(
-                    type=ChatWebSocketResponseType.STATUS,
-                    status=StatusData(success=False, message="Error saving message")
-                ).model_dump(exclude_none=True))
+                logger.error(f"Error saving message in conversation {conversation_id}")
+                await websocket.send_text(_MESSAGE_NOT_SAVED)
                 continue
-            # Send message to client
+            # Queue message to client, marking it as sent or failed once delivered
             if not settings.testing:
-                try:
-                    twilio_response = await send_msg_twilio(conversation.client_phone, agent_message)
-                except httpx.HTTPError as e:
-                    logger.error(f"Error sending message to client: {e}")
-                    # Rollback message
-                    await rollback_message(message, websocket)
-                    continue
-                if not twilio_response.status_code == httpx.codes.OK:
-                    logger.error("Error sending message to client")
-                    # Rollback message
-                    await rollback_message(message, websocket)
-                    continue
+                await enqueue_twilio_message(
+                    conversation_id, conversation.client_phone, agent_message,
+                    on_error=partial(rollback_message, message, websocket),
+                    on_success=partial(confirm_message, message)
+                )
             # Send message to users up in the hierarchy based on assigned user
-            users_to_notify = users_helper.get_user_ancestors(conversation.assigned_user_id)
+            users_to_notify = set(ancestors_task.result() or ())
             if users_to_notify:
                 # If connected user is not the assigned user, send notification to assigned user
                 if conversation.assigned_user_id:
-                    users_to_notify.append(conversation.assigned_user_id)
-                for ancestor_id in users_to_notify:
-                    await socket_manager.send_notification(ancestor_id, Notification(
-                        type=NotificationType.NEW_MESSAGE,
-                        message=MessageData(
-                            content=agent_message,
-                            timestamp=datetime.now(),
-                            conversation_id=conversation_id,
-                            created_at=message.created_at,
-                            user_id=user.id,
-                            user_name=user.full_name,
-                            sender_type=SenderType.AGENT
-                        )
-                    ))
-            # Send success response
-            await websocket.send_json(ChatWebSocketResponse(
-                type=ChatWebSocketResponseType.STATUS,
-                status=StatusData(success=True, message="Message sent")
-            ).model_dump(exclude_none=True))
+                    users_to_notify.add(conversation.assigned_user_id)
+                await socket_manager.broadcast(users_to_notify, Notification(
+                    type=NotificationType.NEW_MESSAGE,
+                    message=MessageData(
+                        content=agent_message,
+                        conversation_id=conversation_id,
+                        created_at=message.created_at,
+                        user_id=user.id,
+                        user_name=user.full_name,
+                        sender_type=SenderType.AGENT
+                    )
+                ))
+            # Send success response, delivery to the client is confirmed by the outbound worker
+            await websocket.send_text(_MESSAGE_SENT if settings.testing else _MESSAGE_QUEUED)
     except WebSocketDisconnect:
-        await socket_manager.remove_connection(WebSocketConfig(
-            ws_type=WebSocketType.CONVERSATION,
-            conversation_id=conversation_id,
-            user_id=user_id
-        ))
+        await socket_manager.remove_connection(ws_config)
         logger.info(f"Conversation {conversation_id} disconnected")
     except Exception as e:
         logger.error(f"Error in websocket: {e}")
\ No newline at end of file
@@ -1,22 +1,50 @@
+import asyncio
 import base64
-from datetime import datetime
-from fastapi import APIRouter, HTTPException, Request, UploadFile
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 from app.helpers import conversations, messages
 from app.utilities.logger import logger
 from app.helpers.conversations import set_uncount_messages, get_conversation_by_id
-from app.helpers.users import assign_conversation_to_agent, get_user_by_id, get_user_ancestors, get_all_users_by_role
+from app.helpers.users import assign_conversation_to_agent, get_user_by_id
+from app.helpers.notifications import build_recipients
 from app.helpers.twilio import send_message as send_msg_twilio
 from app.helpers.twilio import end_conversation as end_chatbot
 from app.models.assignment import AssignmentTypeEnum
 from app.models.message import Message, SenderTypeEnum
-from app.models.conversation import Conversation, ConversationStateEnum
+from app.models.conversation import Conversation, ConversationStateEnum, EndConversation, TransferConversation
 from app.models.websockets import Notification, NotificationType, MessageData, SenderType, ConversationData
 from app.models.user import UserRoleEnum
 from app.utilities.socket import socket_manager
+from app.utilities import jobs
 
 router = APIRouter()
 
+# Uploads are read in chunks whose size is a multiple of 3, so each chunk
+# encodes to base64 on its own without padding in the middle of the output
+_UPLOAD_CHUNK_SIZE = 3 * 256 * 1024
+# Encoded attachment bytes saved together in one transaction before sending
+_MEDIA_BATCH_SIZE = 8 * 1024 * 1024
+
+
+async def _encode_upload(upload: UploadFile) -> tuple[str, int]:
+    """
+    Encodes an uploaded file to base64 chunk by chunk, without holding the raw
+    file in memory.
+
+    Args:
+    - upload (UploadFile): The uploaded file.
+
+    Returns:
+    - tuple[str, int]: The base64 encoded content and the size of the file in bytes.
+    """
+    encoded = bytearray()
+    size = 0
+    while chunk := await upload.read(_UPLOAD_CHUNK_SIZE):
+        size += len(chunk)
+        encoded += base64.b64encode(chunk)
+    return encoded.decode("ascii"), size
+
 
 @router.get("", status_code=201)
 async def get_all_conversations(
@@ -34,7 +62,9 @@ async def get_all_conversations(
     - dict: A dictionary containing the conversations.
     """
     user = request.state.current_user
-    response = conversations.get_all_conversations(user_id=user.id, user_selected_id=user_id)
+    response = await run_in_threadpool(
+        conversations.get_all_conversations, user_id=user.id, user_selected_id=user_id
+    )
     return response
 
 
@@ -54,12 +84,12 @@ async def get_conversation_messages(
     - dict: A dictionary containing the conversation details and messages.
     """
     user = request.state.current_user
-    conversation = conversations.get_conversation_by_id(id)
+    conversation = await run_in_threadpool(conversations.get_conversation_by_id, id)
     if not conversation:
         raise HTTPException(status_code=404, detail="Conversation not found")
-    msgs = messages.get_all_messages_by_conversation(id)
+    msgs = await run_in_threadpool(messages.get_all_messages_by_conversation, id)
     if user.id == conversation.assigned_user_id:
-        set_uncount_messages(id, 0)
+        await run_in_threadpool(set_uncount_messages, id, 0)
     response = {
         'detail': conversation.to_dict(),
         'messages': msgs
@@ -68,6 +98,177 @@ async def get_conversation_messages(
     return response
 
 
+def _new_agent_message(conversation: Conversation, user, content: str) -> Message:
+    """
+    Builds a message sent by an agent in a conversation.
+
+    Args:
+    - conversation (Conversation): The conversation the message belongs to.
+    - user (User): The agent sending the message.
+    - content (str): The content of the message.
+
+    Returns:
+    - Message: The unsaved message.
+    """
+    message = Message()
+    message.content = content
+    message.conversation_id = conversation.id
+    message.sender_type = SenderTypeEnum.AGENT
+    message.user_id = user.id
+    return message
+
+
+async def _notify_message(conversation: Conversation, user, message: Message, recipients: frozenset[int]) -> None:
+    """
+    Publishes a saved agent message to the conversation and notifies the recipients.
+
+    Args:
+    - conversation (Conversation): The conversation the message belongs to.
+    - user (User): The agent sending the message.
+    - message (Message): The saved message, whose creation date was set by the database.
+    - recipients (frozenset[int]): The IDs of the users to notify.
+    """
+    msg_data = MessageData(
+        content=message.content,
+        created_at=message.created_at,
+        conversation_id=conversation.id,
+        user_id=user.id,
+        user_name=user.full_name,
+        sender_type=SenderType.AGENT
+    )
+    await asyncio.gather(
+        socket_manager.broadcast(recipients, Notification(
+            type=NotificationType.NEW_MESSAGE,
+            message=msg_data
+        )),
+        socket_manager.send_message(conversation.id, msg_data)
+    )
+
+
+async def _send_text_only(
+    conversation: Conversation,
+    user,
+    text: str | None,
+    recipients: frozenset[int],
+    user_name: str | None
+) -> list[dict]:
+    """
+    Sends a message without attachments.
+
+    Args:
+    - conversation (Conversation): The conversation the message belongs to.
+    - user (User): The agent sending the message.
+    - text (str | None): The text of the message.
+    - recipients (frozenset[int]): The IDs of the users to notify.
+    - user_name (str | None): The agent name shown to the client, if any.
+
+    Returns:
+    - list[dict]: A list with a dictionary containing the saved message.
+    """
+    message = _new_agent_message(conversation, user, text or "")
+    message_obj, _ = await run_in_threadpool(messages.save_message, message, conversation.id)
+    if not message_obj:
+        raise HTTPException(status_code=500, detail="Error saving message")
+    # Send to the client and notify every recipient concurrently
+    await asyncio.gather(
+        _notify_message(conversation, user, message_obj, recipients),
+        send_msg_twilio(conversation.client_phone, text, None, user_name)
+    )
+    return [{
+        'message': message_obj.to_dict(),
+        'media': None
+    }]
+
+
+async def _send_with_media(
+    conversation: Conversation,
+    user,
+    text: str | None,
+    uploads: list[UploadFile],
+    recipients: frozenset[int],
+    user_name: str | None
+) -> list[dict]:
+    """
+    Sends one message per attachment, only the first one keeping the text.
+
+    Attachments are encoded and saved in batches of at most
+    _MEDIA_BATCH_SIZE encoded bytes, each batch in a single transaction, so
+    only one batch of files is held in memory at a time. A batch is sent to
+    the client and published to the conversation in order, the two streams
+    running concurrently, before the next one is read.
+
+    Args:
+    - conversation (Conversation): The conversation the messages belong to.
+    - user (User): The agent sending the messages.
+    - text (str | None): The text sent to the client along with each attachment.
+    - uploads (list[UploadFile]): The uploaded files.
+    - recipients (frozenset[int]): The IDs of the users to notify.
+    - user_name (str | None): The agent name shown to the client, if any.
+
+    Returns:
+    - list[dict]: A list of dictionaries containing each saved message and media.
+    """
+    response = []
+    pending, pending_size = [], 0
+
+    async def flush():
+        saved = await run_in_threadpool(messages.save_messages, pending, conversation.id)
+        if not saved:
+            raise HTTPException(status_code=500, detail="Error saving message")
+
+        async def notify_all():
+            for message_obj, _ in saved:
+                await _notify_message(conversation, user, message_obj, recipients)
+
+        async def send_all():
+            for _, media_dict in pending:
+                await send_msg_twilio(conversation.client_phone, text, media_dict, user_name)
+
+        await asyncio.gather(notify_all(), send_all())
+        response.extend({
+            'message': message_obj.to_dict(),
+            'media': message_media
+        } for message_obj, message_media in saved)
+
+    for i, upload in enumerate(uploads):
+        media_content, media_size = await _encode_upload(upload)
+        media_dict = None
+        if media_size:
+            media_dict = {
+                'media_url': media_content,
+                'filename': upload.filename,
+                'mime_type': upload.content_type,
+                'size': media_size
+            }
+        content = text if text and i == 0 else ""
+        pending.append((_new_agent_message(conversation, user, content), media_dict))
+        pending_size += len(media_content)
+        if pending_size >= _MEDIA_BATCH_SIZE:
+            await flush()
+            pending, pending_size = [], 0
+    if pending:
+        await flush()
+    return response
+
+
+async def _finalize_chatbot(conversation_id: str, client_phone: str, agent_name: str) -> None:
+    """
+    Hands a finished conversation back to the chatbot and, once it accepts it,
+    assigns the waiting conversations to the agents.
+
+    Args:
+    - conversation_id (str): The chatbot thread ID of the conversation.
+    - client_phone (str): The WhatsApp number of the client.
+    - agent_name (str): The name of the agent who handled the conversation.
+    """
+    try:
+        chatbot_response = await end_chatbot(conversation_id, client_phone, agent_name)
+        if chatbot_response.status_code == 200:
+            await conversations.massive_asignation()
+    except Exception as e:
+        logger.error(f"Error finalizing conversation {conversation_id} with the chatbot: {e}")
+
+
 @router.post("/{id}")
 async def send_message(
     id: int, 
@@ -85,13 +286,12 @@ async def send_message(
     """
     try:
         body = await request.form()
-        files: list[UploadFile|None] = body.getlist("files")
+        files: list[UploadFile] = body.getlist("files")
         user = request.state.current_user
-        user_id = user.id
         user_name = None
         if user.role_id != UserRoleEnum.ADMIN.value:
             user_name = user.full_name
-        conversation = conversations.get_conversation_by_id(id)
+        conversation = await run_in_threadpool(conversations.get_conversation_by_id, id)
         if not conversation:
             raise HTTPException(status_code=404, detail="Conversation not found")
         if conversation.state_id == ConversationStateEnum.CLOSED.value:
@@ -103,58 +303,18 @@ async def send_message(
             'status': False,
             'data': []
         }
-        if not len(files):
-            files = [None]
-        for i, _file in enumerate(files):
-            media_content = await _file.read() if _file else None
-            media_dict = None
-            if (media_content):
-                media_dict = {}
-                media_dict['media_url'] = base64.b64encode(media_content).decode("utf-8")
-                media_dict['filename'] = _file.filename
-                media_dict['mime_type'] = _file.content_type
-                media_dict['size'] = len(media_content)
-
-            message = Message()
-            message.content = message_text if message_text and i == 0 else ""
-            message.conversation_id = id
-            message.sender_type = SenderTypeEnum.AGENT
-            message.user_id = user_id
-            message_obj, message_media = messages.save_message(message, id, media_dict)
-            # print(message_obj, message_media)
-            if message_obj:
-                response = await send_msg_twilio(conversation.client_phone, body.get("message"), media_dict, user_name)
-            # Send message to users up in the hierarchy based on assigned user
-            users_to_notify = get_user_ancestors(conversation.assigned_user_id)
-            admin_users = get_all_users_by_role(role_id=UserRoleEnum.PRINCIPAL.value)
-            if users_to_notify:
-                users_to_notify = users_to_notify + [user['id'] for user in admin_users if user['id'] not in users_to_notify]
-            else:
-                users_to_notify = [user['id'] for user in admin_users]
-            
-            msg_data = MessageData(
-                content=message.content,
-                created_at=datetime.now(),
-                conversation_id=id,
-                user_id=user_id,
-                user_name=user.full_name,
-                sender_type=SenderType.AGENT
+        # Users up in the hierarchy of the assigned user, plus the principals,
+        # are the same for every file sent in this request
+        users_to_notify = await run_in_threadpool(build_recipients, conversation.assigned_user_id)
+        if files:
+            response_msgs["data"] = await _send_with_media(
+                conversation, user, message_text, files, users_to_notify, user_name
+            )
+        else:
+            response_msgs["data"] = await _send_text_only(
+                conversation, user, message_text, users_to_notify, user_name
             )
-            # If connected user is not the assigned user, send notification to assigned user
-            if conversation.assigned_user_id:
-                users_to_notify.append(conversation.assigned_user_id)
-            for ancestor_id in users_to_notify:
-                await socket_manager.send_notification(ancestor_id, Notification(
-                    type=NotificationType.NEW_MESSAGE,
-                    message=msg_data
-                ))
-            await socket_manager.send_message(conversation.id, msg_data)
-            response_msgs["data"].append({
-                'message': message_obj.to_dict(),
-                'media': message_media
-            })
         response_msgs["status"] = True
-        # print(response_msgs)
         return response_msgs
     except KeyError as e:
         logger.error(e)
@@ -165,26 +325,24 @@ async def send_message(
 
 
 @router.post("/{id}/transfer")
-async def transfer_conversation(id: int, request: Request):
+async def transfer_conversation(id: int, body: TransferConversation, request: Request):
     """
     Transfers a conversation to another agent.
 
     Args:
     - id (int): The ID of the conversation.
+    - body (TransferConversation): The agent to transfer the conversation to.
     - request (Request): The incoming request.
 
     Returns:
     - dict: A dictionary containing the result of the transfer operation.
     """
-    body = await request.json()
     session_user = request.state.current_user
-    if 'user_id' not in body:
-        raise HTTPException(status_code=400, detail="There are missing parameters in the payload.")
-    conversation_obj = get_conversation_by_id(id)
+    conversation_obj = await run_in_threadpool(get_conversation_by_id, id)
     if not conversation_obj:
         raise HTTPException(status_code=404, detail="Conversation doesn't exist.")
     response = await assign_conversation_to_agent(
-        id, body.get("user_id"),
+        id, body.user_id,
         session_user,
         AssignmentTypeEnum.TRANSFERRED.value
     )
@@ -194,83 +352,79 @@ async def transfer_conversation(id: int, request: Request):
 
 
 @router.post("/{id}/endChat")
-async def end_conversation(id: int, request: Request):
+async def end_conversation(id: int, body: EndConversation, request: Request, tasks: BackgroundTasks):
     """
     Ends a conversation.
 
+    The chatbot is notified after the response is sent, so clients do not
+    wait for it.
+
     Args:
     - id (int): The ID of the conversation.
+    - body (EndConversation): The typification of the conversation.
     - request (Request): The incoming request.
+    - tasks (BackgroundTasks): The tasks to run after the response is sent.
 
     Returns:
     - dict: A dictionary containing the result of the end conversation operation.
     """
-    body = await request.json()
-    conversation_obj = conversations.get_conversation_by_id(id)
+    conversation_obj = await run_in_threadpool(conversations.get_conversation_by_id, id)
     session_user = request.state.current_user
-    assigned_user = get_user_by_id(conversation_obj.assigned_user_id)
+    assigned_user = await run_in_threadpool(get_user_by_id, conversation_obj.assigned_user_id)
     if conversations.unable_end_conversation_conditional(assigned_user, session_user):
         return HTTPException(status_code=403, detail="You can't finish this conversation")
     
     typification_data = {
-        "conversation": conversation_obj.to_dict(),
-        "motive": body.get('motive'),
-        "comment": body.get('filteredSubcategorias', ""),
-        "client_id": body.get('client_id'),
+        "motive": body.motive,
+        "comment": body.filteredSubcategorias,
+        "client_id": body.client_id,
     }
     
     agent_name = session_user.full_name if not assigned_user else assigned_user.full_name
     
-    response = conversations.end_conversation(
+    response = await run_in_threadpool(
+        conversations.end_conversation,
         conversation_obj.id,
         typification_data, 
         request.state.current_user
     )
     
     if response:
-        chatbot_response = await end_chatbot(
-            conversation_obj.conversation_id, 
-            conversation_obj.client_phone, 
+        await jobs.cancel(jobs.DEFAULT_MESSAGE_JOB, conversation_obj.conversation_id)
+        tasks.add_task(
+            _finalize_chatbot,
+            conversation_obj.conversation_id,
+            conversation_obj.client_phone,
             agent_name
         )
-        if (chatbot_response.status_code == 200):
-            await conversations.massive_asignation()
     message_data = MessageData(
         conversation_id=id,
         content="##EndChat##",
         created_at=conversation_obj.updated_at,
         sender_type=SenderType.AGENT
     )
-    users_to_notify = get_user_ancestors(conversation_obj.assigned_user_id)
-    admin_users = get_all_users_by_role(role_id=UserRoleEnum.PRINCIPAL.value)
-    if users_to_notify:
-        users_to_notify = users_to_notify + [user['id'] for user in admin_users if user['id'] not in users_to_notify]
-    else:
-        users_to_notify = [user['id'] for user in admin_users]
+    users_to_notify = await run_in_threadpool(build_recipients, conversation_obj.assigned_user_id)
     # Creating Notification object with the respective event
     notification = Notification(
         type=NotificationType.END_CONVERSATION,
         message=message_data
     )
-    # If connected user is not the assigned user, send notification to assigned user
-    if conversation_obj.assigned_user_id:
-        users_to_notify.append(conversation_obj.assigned_user_id)
-    for ancestor_id in users_to_notify:
-        await socket_manager.send_notification(ancestor_id, notification)
-    await socket_manager.send_message(id, message_data)
+    await asyncio.gather(
+        socket_manager.broadcast(users_to_notify, notification),
+        socket_manager.send_message(id, message_data)
+    )
     return response
 
 
 @router.post("/{id}/reset-unread-count")
 async def reset_unread_count(id: int) -> dict:
-    set_uncount_messages(id, 0)
-    conversation_obj = conversations.get_conversation_by_id(id)
-    users_to_notify = get_user_ancestors(conversation_obj.assigned_user_id)
-    admin_users = get_all_users_by_role(role_id=UserRoleEnum.PRINCIPAL.value)
-    if users_to_notify:
-        users_to_notify = users_to_notify + [user['id'] for user in admin_users if user['id'] not in users_to_notify]
-    else:
-        users_to_notify = [user['id'] for user in admin_users]
+    await run_in_threadpool(set_uncount_messages, id, 0)
+    conversation_obj = await run_in_threadpool(conversations.get_conversation_by_id, id)
+    # The assigned user already knows they read the messages
+    users_to_notify = await run_in_threadpool(
+        build_recipients, conversation_obj.assigned_user_id,
+        exclude_user_id=conversation_obj.assigned_user_id
+    )
     # Creating Notification object with the respective event
     notification = Notification(
         type=NotificationType.MESSAGES_READ,
@@ -284,8 +438,5 @@ async def reset_unread_count(id: int) -> dict:
             state_id=conversation_obj.state_id
         )
     )
-    for user_id in users_to_notify:
-        if conversation_obj.assigned_user_id == user_id:
-            continue
-        await socket_manager.send_notification(user_id, notification)
+    await socket_manager.broadcast(users_to_notify, notification)
     return JSONResponse(status_code=200, content={"success": True})
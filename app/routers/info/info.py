@@ -3,6 +3,12 @@ from app.helpers import users
 
 router = APIRouter()
 
+# Loaders of each supported entity list, both served from the users catalog cache
+_ENTITY_DISPATCH = {
+    'states': users.get_all_user_states,
+    'roles': users.get_all_users_roles,
+}
+
 @router.get("/{entity}", status_code=200)
 async def get_list_by_entity(entity: str) -> list:
     """
@@ -17,10 +23,7 @@ async def get_list_by_entity(entity: str) -> list:
     Raises:
     HTTPException: If the entity type is not supported.
     """
-    if entity == 'states':
-        entity_list = users.get_all_user_states()
-    elif entity == 'roles':
-        entity_list = users.get_all_users_roles()
-    else:
+    get_entity_list = _ENTITY_DISPATCH.get(entity)
+    if get_entity_list is None:
         raise HTTPException(status_code=400, detail="Unsupported entity type")
-    return entity_list
+    return get_entity_list()
@@ -1,4 +1,4 @@
-from fastapi import APIRouter, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, WebSocket
 from app.helpers.users import change_user_state
 from app.models.user import UserStateEnum
 from app.utilities.socket import socket_manager, WebSocketConfig, WebSocketType
@@ -9,12 +9,12 @@ router = APIRouter()
 
 
 @router.post("/send")
-async def send_notification(user_id: str, notification: Notification):
+async def send_notification(user_id: int, notification: Notification):
     """
     Send a notification to a user.
 
     Args:
-    - user_id (str): The ID of the user to send the notification to.
+    - user_id (int): The ID of the user to send the notification to.
     - notification (Notification): The notification to send.
 
     Returns:
@@ -37,22 +37,21 @@ async def websocket_endpoint(websocket: WebSocket, user_id: int):
     - None
     """
     await websocket.accept()
-    await socket_manager.add_connection(WebSocketConfig(
+    ws_config = WebSocketConfig(
         ws_type=WebSocketType.NOTIFICATIONS,
         user_id=user_id
-    ), websocket)
+    )
+    await socket_manager.add_connection(ws_config, websocket)
     user = change_user_state(user_id, UserStateEnum.ONLINE.value)
     if not user:
         logger.error(f"Error changing user {user_id} state to ONLINE")
     logger.info(f"User {user_id} connected")
     try:
-        while True:
-            await websocket.receive_text()
-    except WebSocketDisconnect:
-        await socket_manager.remove_connection(WebSocketConfig(
-            ws_type=WebSocketType.NOTIFICATIONS,
-            user_id=user_id
-        ))
+        # Clients send nothing on this socket, so frames are read raw only to
+        # notice the disconnect; liveness is left to the server's ping/pong
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+        await socket_manager.remove_connection(ws_config)
         user = change_user_state(user_id, UserStateEnum.OFFLINE.value)
         if not user:
             logger.error(f"Error changing user {user_id} state to OFFLINE")
@@ -1,28 +1,22 @@
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException
 from app.helpers import conversations, users
-from app.models.user import UserStateEnum
+from app.models.user import UserStateEnum, UpdateUserState, UsersByRole
 
 router = APIRouter()
 
 
 @router.post("", status_code=200)
-async def get_users_by_role(request: Request):
+async def get_users_by_role(data: UsersByRole):
     """
     Retrieves a list of users based on their role.
 
     Args:
-    - request (Request): The incoming request containing the role ID.
+    - data (UsersByRole): The role ID, and optionally the parent user ID, to filter by.
 
     Returns:
     - A list of users matching the specified role.
-
-    Raises:
-    - HTTPException: If the role ID is missing from the request body.
     """
-    data = await request.json()
-    if "role_id" not in data:
-        raise HTTPException(status_code=400, detail="Role id is required")
-    users_list = users.get_all_users_by_role(data["role_id"], data.get("user_id", None))
+    users_list = users.get_all_users_by_role(data.role_id, data.user_id)
     return users_list
 
 
@@ -47,12 +41,12 @@ async def get_users_by_conversation(id: int):
     return user_list
 
 @router.put("/{id}/state")
-async def change_user_state(request: Request, id: str):
+async def change_user_state(data: UpdateUserState, id: str):
     """
     Updates the state of a user.
 
     Args:
-    - request (Request): The incoming request containing the new state ID.
+    - data (UpdateUserState): The new state ID.
     - id (str): The ID of the user.
 
     Returns:
@@ -61,9 +55,8 @@ async def change_user_state(request: Request, id: str):
     Raises:
     - HTTPException: If the user or state is not found.
     """
-    data = await request.json()
-    user = users.change_user_state(id, data["state_id"])
-    if data["state_id"] == UserStateEnum.ONLINE.value:
+    user = users.change_user_state(id, data.state_id)
+    if data.state_id == UserStateEnum.ONLINE.value:
         await conversations.massive_asignation()
     if not user:
         raise HTTPException(status_code=404, detail="User not found or state not found")
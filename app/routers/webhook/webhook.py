@@ -1,13 +1,18 @@
-import httpx
 import asyncio
+import httpx
+import orjson
 from fastapi import APIRouter, Request, HTTPException
-from app.helpers import messages, conversations, users
+from fastapi.concurrency import run_in_threadpool
+from app.helpers import messages, conversations
+from app.helpers.notifications import build_recipients
 from app.helpers.chatbot import load_chatbot_messages
 from app.helpers.messages import save_message
 from app.helpers.twilio import send_message, end_conversation
 from app.models.message import Message, SenderTypeEnum
 from app.models.user import UserRoleEnum
 from app.models.conversation import ConversationStateEnum
+from app.config import settings
+from app.utilities import jobs
 from app.utilities.logger import logger
 from app.utilities.socket import socket_manager
 from app.models.websockets import Notification, NotificationType, MessageData, SenderType
@@ -29,11 +34,11 @@ Lamentamos las molestias y agradecemos tu paciencia.
 """
 
 
+@jobs.job(jobs.DEFAULT_MESSAGE_JOB)
 async def send_default_message(thread_id: str):
-    await asyncio.sleep(30 * 60)  # Wait for 5 minutes
     logger.info(f"Sending default message to: {thread_id}")
     conversation = conversations.get_conversation_by_thread_id(thread_id)
-    if not conversation.assigned_user_id and conversation.state_id != ConversationStateEnum.CLOSED:
+    if not conversation.assigned_user_id and conversation.state_id != ConversationStateEnum.CLOSED.value:
         message_count = conversations.get_conversation_user_messages_count(thread_id)
         if message_count > 0:
             return
@@ -41,16 +46,16 @@ async def send_default_message(thread_id: str):
         if not twilio_response.status_code == httpx.codes.OK:
             logger.error("Error sending default message to client")
         try:
-            message = Message()
-            message.content = DEFAULT_MESSAGE
-            message.conversation_id = conversation.id,
-            message.sender_type = SenderTypeEnum.AGENT,
-            message.user_id = 1
-            save_message(message)
+            save_message(Message(
+                content=DEFAULT_MESSAGE,
+                conversation_id=conversation.id,
+                sender_type=SenderTypeEnum.AGENT,
+                user_id=1
+            ), conversation.id)
         except Exception as e:
             logger.error(f"Error while saving default message: {e}")
         conversations.end_conversation(conversation.id)
-        end_conversation(conversation.conversation_id, conversation.client_phone)
+        await end_conversation(conversation.conversation_id, conversation.client_phone)
 
 
 @router.post("/webhook")
@@ -64,7 +69,7 @@ async def chatbot_webhook(request: Request):
     Returns:
     bool: True if the request is processed successfully, otherwise raises an HTTPException.
     """
-    body = await request.json()
+    body = orjson.loads(await request.body())
     logger.info(f"Message: {body}")
     thread_id: str = body.get('thread_id')
     media_url: str | None = body.get('media_url', None)
@@ -76,16 +81,18 @@ async def chatbot_webhook(request: Request):
     # If the conversation does not exist, create a new conversation and assign it to the user.
     if not conversation:
         notify_message = False
-        conversations.create_conversation(body)
-        await conversations.massive_asignation()
-        conversation = conversations.get_conversation_by_thread_id(thread_id)
-        if conversation:
-            if conversation.state_id == ConversationStateEnum.CLOSED.value:
-                logger.info(f"Webhook request ignored, conversation {conversation.id} already closed")
-                return False
-            conversation_id = conversation.id
-            load_chatbot_messages(thread_id, conversation_id, body.get('message'))
-            asyncio.create_task(send_default_message(thread_id))
+        conversation = conversations.create_conversation(body)
+        assignments = await conversations.massive_asignation()
+        if conversation.id in assignments:
+            # Reflect the assignment instead of reading the conversation again
+            conversation.assigned_user_id = assignments[conversation.id]
+            conversation.state_id = ConversationStateEnum.OPEN.value
+        conversation_id = conversation.id
+        load_chatbot_messages(thread_id, conversation_id, body.get('message'))
+        # Sent by whichever worker picks the job once the delay is over, only
+        # needed while the conversation waits for an agent
+        if conversation.id not in assignments:
+            await jobs.schedule(jobs.DEFAULT_MESSAGE_JOB, thread_id, delay=settings.default_message_delay)
     else:
         conversation_id = conversation.id
     if conversation.state_id == ConversationStateEnum.CLOSED.value:
@@ -95,22 +102,19 @@ async def chatbot_webhook(request: Request):
         media_dict = {
             'media_url': media_url
         }
-    # Store message in database
-    message, message_media = messages.save_message(Message(
-        conversation_id=conversation_id,
-        content=body.get('message'),
-        sender_type=SenderTypeEnum.CLIENT,
-        user=None
-    ), conversation_id, media_dict)
+    # Store message in database while the users to notify are resolved; the
+    # role members come from cache, leaving the ancestors query to overlap the insert
+    (message, message_media), users_to_notify = await asyncio.gather(
+        run_in_threadpool(messages.save_message, Message(
+            conversation_id=conversation_id,
+            content=body.get('message'),
+            sender_type=SenderTypeEnum.CLIENT,
+            user=None
+        ), conversation_id, media_dict),
+        run_in_threadpool(build_recipients, conversation.assigned_user_id, UserRoleEnum.ADMIN.value)
+    )
     if not message:
         raise HTTPException(status_code=500, detail="Something went wrong")
-
-    users_to_notify = users.get_user_ancestors(conversation.assigned_user_id)
-    admin_users = users.get_all_users_by_role(role_id=UserRoleEnum.ADMIN.value)
-    if users_to_notify:
-        users_to_notify = users_to_notify + [user['id'] for user in admin_users if user['id'] not in users_to_notify]
-    else:
-        users_to_notify = [user['id'] for user in admin_users]
     # Setting message payload
     message_data = MessageData(
         conversation_id=message.conversation_id,
@@ -119,13 +123,11 @@ async def chatbot_webhook(request: Request):
         sender_type=SenderType.CLIENT,
         phone_number=conversation.client_phone,
         user_id=None,
-        attachment=media_url
+        attachment=media_url,
+        attachment_type=message_media.get('mime_type') if message_media else None,
+        attachment_name=message_media.get('filename') if message_media else None
     )
 
-    if message_media:
-        message_data.attachment_type = message_media.get('mime_type')
-        message_data.attachment_name = message_media.get('filename')
-
     # Creating Notification object with the respective event
     notification = Notification(
         type=NotificationType.NEW_MESSAGE if notify_message else NotificationType.NEW_CONVERSATION,
@@ -133,10 +135,7 @@ async def chatbot_webhook(request: Request):
     )
     
     if users_to_notify:
-        if (conversation.assigned_user_id):
-            users_to_notify.append(conversation.assigned_user_id)
-        for user_id in users_to_notify:
-            await socket_manager.send_notification(user_id, notification)
+        await socket_manager.broadcast(users_to_notify, notification)
         await socket_manager.send_message(conversation.id, message_data)
     
     return True
\ No newline at end of file
@@ -0,0 +1,150 @@
+from app.config import settings
+from urllib.parse import urlparse
+
+
+# Layout shared by every email: the document up to its title, the logos up to
+# the main content, and the legal footer after it
+_HEAD = """
+<!DOCTYPE html>
+<html lang="es">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>"""
+
+_BODY_START = """</title>
+    <style>
+        :root {
+            --primary-blue: #0E5D9D;
+            --secondary-blue: #2EA8E0;
+            --white: #FFFFFF;
+            --gray-light: #f8f9fa;
+            --gray-medium: #E5E5E5;
+            --gray-dark: #666;
+        }
+        
+        body {
+            font-family: Arial, sans-serif;
+            line-height: 1.6;
+            color: var(--gray-dark);
+            margin: 0;
+            padding: 0;
+            background-color: var(--gray-light);
+        }
+        
+        .collaboration-container {
+            display: flex;
+            align-items: center;
+            justify-content: center;
+            gap: 20px;
+        }
+        
+        .collaboration-x {
+            font-size: 24px;
+            font-weight: bold;
+            color: #0E5D9D;
+        }
+    </style>
+</head>
+<body style="background-color: #f8f9fa; padding: 20px;">
+    <!-- Logo Section -->
+    <table role="presentation" cellspacing="0" cellpadding="0" border="0" width="100%" style="max-width: 600px; margin: 0 auto;">
+        <tr>
+            <td style="text-align: center; padding: 40px;">
+                <table role="presentation" cellspacing="0" cellpadding="0" border="0" style="width: 100%;">
+                    <tr>
+                        <td style="width: 45%; text-align: right;">
+                            <img src="cid:logo" alt="Equirent Logo" style="width: auto; height: 45px; display: inline-block;">
+                        </td>
+                        <td style="width: 10%; text-align: center; vertical-align: middle;">
+                            <span style="display: inline-block; font-size: 28px; font-weight: bold; color: #0E5D9D; line-height: 45px;">×</span>
+                        </td>
+                        <td style="width: 45%; text-align: left;">
+                            <img src="cid:logo2" alt="Partner Logo" style="width: auto; height: 45px; display: inline-block;">
+                        </td>
+                    </tr>
+                </table>
+            </td>
+        </tr>
+    </table>
+
+    <!-- Main Content -->
+"""
+
+_FOOTER = """
+    <!-- Footer Section -->
+    <table role="presentation" cellspacing="0" cellpadding="0" border="0" width="100%" style="max-width: 600px; margin: 20px auto 0; background-color: #f8f9fa; border-radius: 12px; box-shadow: 0 2px 4px rgba(14, 93, 157, 0.05);">
+        <tr>
+            <td style="padding: 20px; font-size: 12px; color: #666; text-align: justify;">
+                <p style="margin-bottom: 10px;">Este mensaje y los anexos pueden contener información confidencial o legalmente protegida y no puede ser utilizada ni divulgada por personas y/o entidades diferentes a su destinatario. Si el lector de este mensaje no fuera el destinatario, considérese por este medio informado de que la retención, difusión, o copia de este correo electrónico está estrictamente prohibida. Si este es el caso, por favor informe de ello al remitente y elimine el mensaje de inmediato, de tal manera que no pueda acceder a él de nuevo.</p>
+                <p style="margin-bottom: 10px;">Las opiniones contenidas en este mensaje electrónico no relacionadas con la actividad de Equirent, no necesariamente representan la opinión de la Compañía. Equirent Vehículos y Maquinaria SAS, Equirent SA, Equirent Blindados LTDA, CasaToro Rental SAS no se hace responsable en caso de que en este mensaje o en los archivos adjuntos haya presencia de algún virus que pueda generar daños en los equipos o programas del destinatario. El uso de este correo es exclusivamente para uso interno en Equirent Vehículos y Maquinaria SAS, Equirent SA, Equirent Blindados LTDA, CasaToro Rental SAS y no está creado para efectos de comunicaciones formales de la Compañía hacia terceros, por lo que el contenido de este correo no obliga ni vincula de manera alguna a Equirent Vehículos y Maquinaria SAS, Equirent SA, Equirent Blindados LTDA, CasaToro Rental SAS.</p>
+                <p style="margin-bottom: 0;">Aviso Importante: Las anteriores compañías tratarán la información de conformidad con los principios y disposiciones contenidas en la Ley 1266 de 2008, 1581 de 2012 y el Decreto 1377 del 2013.</p>
+            </td>
+        </tr>
+    </table>
+</body>
+</html>
+"""
+
+# Same replacements as html.escape, done in a single pass over the link;
+# links without any of these characters are used as they are
+_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+_ESCAPED_CHARS = frozenset('&<>"\'')
+# Links are only accepted on the frontend host, over http or https
+_FRONT_NETLOC = urlparse(settings.front_url).netloc
+_ALLOWED_PREFIXES = (f"http://{_FRONT_NETLOC}/", f"https://{_FRONT_NETLOC}/")
+
+
+def _minify(template: str) -> str:
+    """
+    Drops the indentation and blank lines of an email. Mail clients collapse
+    that whitespace anyway, and the templates have no preformatted content.
+
+    Args:
+    template (str): The HTML of the email.
+
+    Returns:
+    str: The HTML with each line stripped and empty lines removed.
+    """
+    return "\n".join(line for line in map(str.strip, template.splitlines()) if line)
+
+
+def build(title: str, content: str, placeholder: str) -> tuple[str, ...]:
+    """
+    Builds an email from the shared layout, minified, and splits it around its
+    link placeholder, so rendering only has to join the parts.
+
+    Args:
+    title (str): The title of the email.
+    content (str): The main content of the email, containing the placeholder.
+    placeholder (str): The placeholder the link replaces.
+
+    Returns:
+    tuple[str, ...]: The parts of the email around each occurrence of the placeholder.
+    """
+    template = f"{_HEAD}{title}{_BODY_START}{content}{_FOOTER}"
+    return tuple(_minify(template).split(placeholder))
+
+
+def render(parts: tuple[str, ...], link: str) -> str | None:
+    """
+    Injects a link into an email built by `build`, after validating that it uses
+    http or https and points to the frontend host.
+
+    Args:
+    parts (tuple[str, ...]): The parts of the email around its link placeholder.
+    link (str): The link to be injected into the email.
+
+    Returns:
+    str: The email with the link injected, or None if the link is invalid.
+    """
+    safe_link = link if _ESCAPED_CHARS.isdisjoint(link) else link.translate(_ESCAPE_TABLE)
+    if not safe_link.startswith(_ALLOWED_PREFIXES):
+        return None
+    return safe_link.join(parts)
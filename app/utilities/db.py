@@ -1,38 +1,28 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.orm import DeclarativeBase, sessionmaker
 
 from app.config import settings
 from app.utilities.logger import logger
-import threading
 
-Base = declarative_base()
+class Base(DeclarativeBase):
+    pass
 
-# Singleton class for database connection pool
+# Database connection pool, shared by the whole process through `pool`
 class DatabaseConnectionPool:
     """
-    Singleton class for managing a database connection pool.
+    Class for managing a database connection pool.
     
     Attributes:
         databases (dict): A dictionary mapping database names to their URIs.
     """
-    _instance = None
-    _lock = threading.Lock()
+    __slots__ = ('_engines', '_sessions')
     databases = {'multiagent': settings.sqlserver_uri}
 
-    def __new__(cls):
+    def __init__(self):
         """
-        Creates a new instance of the DatabaseConnectionPool class.
-        
-        Returns:
-            DatabaseConnectionPool: The singleton instance of the class.
+        Initializes the connection pools of the configured databases.
         """
-        if cls._instance is None:
-            with cls._lock:
-                if cls._instance is None:
-                    cls._instance = super(DatabaseConnectionPool, cls).__new__(cls)
-                    cls._instance._initialize_pools()
-        return cls._instance
+        self._initialize_pools()
 
     def _initialize_pools(self):
         """
@@ -43,8 +33,21 @@ class DatabaseConnectionPool:
         for key, uri in self.databases.items():
             try:
                 logger.info(f"Key: {key}, URI: {uri}")
-                self._engines[key] = create_engine(uri)
-                self._sessions[key] = sessionmaker(autocommit=False, autoflush=False, bind=self._engines[key])
+                # Pre-ping replaces connections SQL Server dropped while idle, and
+                # LIFO keeps reusing the warmest connections under light load
+                self._engines[key] = create_engine(
+                    uri,
+                    pool_size=settings.db_pool_size,
+                    max_overflow=settings.db_max_overflow,
+                    pool_recycle=settings.db_pool_recycle,
+                    pool_pre_ping=True,
+                    pool_use_lifo=True
+                )
+                # Objects stay loaded after commit, since every helper closes its
+                # session right after and would otherwise have to refresh them
+                self._sessions[key] = sessionmaker(
+                    autocommit=False, autoflush=False, expire_on_commit=False, bind=self._engines[key]
+                )
             except Exception as e:
                 logger.error(f"Failed to initialize database connection pool for {key}: {str(e)}")
     
@@ -61,9 +64,11 @@ class DatabaseConnectionPool:
         Raises:
             ValueError: If the specified database is not in the list of available databases.
         """
-        if database not in self._sessions:
-            raise ValueError(f"Database {database} not in the list of available databases")
-        return self._sessions[database]()
+        try:
+            session_factory = self._sessions[database]
+        except KeyError:
+            raise ValueError(f"Database {database} not in the list of available databases") from None
+        return session_factory()
 
     @classmethod
     def get_database_uri(cls, key):
@@ -78,6 +83,10 @@ class DatabaseConnectionPool:
         """
         return cls.databases.get(key, None)
 
+
+# Created once when the module is first imported, which Python already guards
+pool = DatabaseConnectionPool()
+
 def get_session(database: str):
     """
     Get a database session from the connection pool.
@@ -95,8 +104,7 @@ def get_session(database: str):
         Exception: Any exceptions raised during session creation or closure 
         will propagate to the caller.
     """
-    db_pool = DatabaseConnectionPool()
-    db = db_pool.get_session(database)
+    db = pool.get_session(database)
     try:
         yield db
     finally:
@@ -118,7 +126,35 @@ def initialize_database():
         table creation will propagate to the caller.
     """
     logger.info("Initializing Database")
-    engine = create_engine(DatabaseConnectionPool.get_database_uri('multiagent'))
+    # Reuse the pooled engine instead of opening a second pool just for this
+    engine = pool._engines['multiagent']
     Base.metadata.create_all(bind=engine)
+    add_message_status_column(engine)
     logger.info("Database Initialized")
-    return engine
\ No newline at end of file
+    return engine
+
+def add_message_status_column(engine):
+    """
+    Add tbl_mensajes.estado_envio to databases created before Message.status existed.
+
+    create_all only creates missing tables, so this column is added here with
+    the same guarded DDL as app/utilities/migrations.sql. The guard makes it
+    a no-op once the column exists, so it is safe to run on every start and
+    from several workers at once.
+
+    Args:
+        engine (Engine): A SQLAlchemy engine connected to the database.
+    """
+    try:
+        with engine.begin() as conn:
+            if engine.dialect.name == "mssql":
+                conn.execute(text(
+                    "IF COL_LENGTH('tbl_mensajes', 'estado_envio') IS NULL "
+                    "ALTER TABLE tbl_mensajes ADD estado_envio VARCHAR(7) NULL"
+                ))
+            elif "estado_envio" not in {column["name"] for column in inspect(conn).get_columns("tbl_mensajes")}:
+                conn.execute(text("ALTER TABLE tbl_mensajes ADD estado_envio VARCHAR(7) NULL"))
+    except Exception as e:
+        # Another worker may have added the column between the check and the ALTER
+        if "estado_envio" not in {column["name"] for column in inspect(engine).get_columns("tbl_mensajes")}:
+            logger.error(f"Error adding tbl_mensajes.estado_envio: {e}")
@@ -3,24 +3,22 @@ from app.models.user import User, UserRole, UsersGroup
 from app.models.conversation import Conversation, ConversationState
 from app.models.message import Message, SenderTypeEnum
 from app.models.template import Template
-from passlib.context import CryptContext
 from contextlib import closing
-from sqlalchemy import text
+from sqlalchemy import insert, select, text
 from sqlalchemy import create_engine
 from app.config import settings
 from app.utilities.logger import logger
 from app.utilities.db import initialize_database
+from app.utilities.passwords import get_password_hash
 
 from faker import Faker
 
 import os
 import uuid
-import json
+import orjson
 
 cd = os.path.dirname(os.path.abspath(__file__))
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 def load_admin():
     """
     Creates an admin user in the database if it does not exist.
@@ -43,7 +41,7 @@ def load_admin():
             username="admin",
             full_name="Administrador",
             email=settings.smtp_sender,
-            password=pwd_context.hash(random_pwsd),
+            password=get_password_hash(random_pwsd),
             role=admin_role,
             is_active=True
         )
@@ -86,13 +84,19 @@ def load_users() -> tuple[int, int]:
         if count > 1:
             logger.info("Users already exist")
             return 0, 0
-        users_list_path = cd + "/users.json"
-        if not os.path.exists(users_list_path):
+        try:
+            with open(cd + "/users.json", "rb") as file:
+                users = orjson.loads(file.read())
+        except FileNotFoundError:
             logger.info("Users file not found")
             return 0, 0
-        with open(cd + "/users.json", "r", encoding="utf-8") as file:
-            users = json.load(file)
+        # Roles and existing usernames are read once instead of per user
+        role_ids = dict(session.query(UserRole.code, UserRole.id).all())
+        existing_usernames = set(session.scalars(
+            select(User.username).where(User.username.in_([user_dict.get("username") for user_dict in users]))
+        ))
         subordinates = {}
+        new_users = []
         agents_start = 0
         agents_end = 0
         for index, user_dict in enumerate(users):
@@ -100,18 +104,15 @@ def load_users() -> tuple[int, int]:
                 agents_start = index
             if user_dict.get("role") == "AGENT":
                 agents_end = index
-            exists = session.query(User).filter(User.username == user_dict.get("username")).first()
-            role = session.query(UserRole).filter(UserRole.code == user_dict.get("role")).first()
-            if exists is None:
-                user = User(
-                    username=user_dict.get('username'),
-                    full_name=user_dict.get('full_name'),
-                    email=user_dict.get('email'),
-                    password=pwd_context.hash(user_dict.get('password')),
-                    role_id=role.id,
-                    is_active=True
-                )
-                session.add(user)
+            if user_dict.get("username") not in existing_usernames:
+                new_users.append({
+                    "username": user_dict.get('username'),
+                    "full_name": user_dict.get('full_name'),
+                    "email": user_dict.get('email'),
+                    "password": get_password_hash(user_dict.get('password')),
+                    "role_id": role_ids[user_dict.get("role")],
+                    "is_active": True
+                })
             else:
                 logger.info(f"User with username {user_dict.get('username')} already exists")
             if "subordinates" in user_dict.keys():
@@ -119,18 +120,28 @@ def load_users() -> tuple[int, int]:
                     if user_dict.get('username') not in subordinates.keys():
                         subordinates[user_dict.get('username')] = []
                     subordinates[user_dict.get('username')].append(subordinate)
+        # Insert the new users and their groups with one batched INSERT each
+        if new_users:
+            session.execute(insert(User), new_users)
         session.commit()
         if subordinates:
+            # Resolve the IDs of every user in the hierarchy with a single query
+            usernames = set(subordinates)
+            for user_subordinates in subordinates.values():
+                usernames.update(user_subordinates)
+            user_ids = dict(
+                session.query(User.username, User.id).filter(User.username.in_(usernames)).all()
+            )
+            groups = []
             for username, user_subordinates in subordinates.items():
-                parent_id = session.query(User).filter(User.username == username).first().id
+                parent_id = user_ids[username]
                 for subordinate in user_subordinates:
-                    child_id = session.query(User).filter(User.username == subordinate).first().id
-                    group = UsersGroup(
-                        parent_id=parent_id,
-                        child_id=child_id,
-                        is_active=True
-                    )
-                    session.add(group)
+                    groups.append({
+                        "parent_id": parent_id,
+                        "child_id": user_ids[subordinate],
+                        "is_active": True
+                    })
+            session.execute(insert(UsersGroup), groups)
             session.commit()
         session.close()
     logger.info("Users created")
@@ -159,42 +170,48 @@ def load_random_users(size: int = 100) -> int:
         agent_role = session.query(UserRole).filter(UserRole.code == "AGENT").first()
         supervisor_role = session.query(UserRole).filter(UserRole.code == "SUPERVISOR").first()
         principal_role = session.query(UserRole).filter(UserRole.code == "PRINCIPAL").first()
-        agents, supervisors, principals = [], [], []
+        # Every random user shares the same password, so bcrypt only runs once
+        hashed_password = get_password_hash("password")
+        users, roles = [], []
         for index in range(size):
             selected_role = agent_role
             if index >= int(size * 0.7) and index < int(size * 0.9):
                 selected_role = supervisor_role
             elif index >= int(size * 0.9):
                 selected_role = principal_role
-            # print(selected_role.code)
-            user = User(
-                username=fake.user_name(),
-                full_name=fake.name(),
-                email=fake.email(),
-                password=pwd_context.hash("password"),
-                role=selected_role,
-                is_active=True
-            )
+            users.append({
+                "username": fake.user_name(),
+                "full_name": fake.name(),
+                "email": fake.email(),
+                "password": hashed_password,
+                "role_id": selected_role.id,
+                "is_active": True
+            })
+            roles.append(selected_role)
+        # Insert every user in one batched INSERT, getting their IDs back in order
+        user_ids = session.scalars(
+            insert(User).returning(User.id, sort_by_parameter_order=True), users
+        ).all()
+        agents, supervisors, principals = [], [], []
+        for user_id, selected_role in zip(user_ids, roles):
             if selected_role == agent_role:
-                agents.append(user)
+                agents.append(user_id)
             elif selected_role == supervisor_role:
-                supervisors.append(user)
+                supervisors.append(user_id)
             else:
-                principals.append(user)
-            session.add(user)
-        session.flush()
+                principals.append(user_id)
+        groups = []
         subs_per_principal = len(supervisors) // len(principals)
-        for index, created_principal in enumerate(principals):
+        for index, principal_id in enumerate(principals):
             subordinates = supervisors[index * subs_per_principal: (index + 1) * subs_per_principal]
-            for subordinate in subordinates:
-                group = UsersGroup(parent_id=created_principal.id, child_id=subordinate.id, is_active=True)
-                session.add(group)
+            for subordinate_id in subordinates:
+                groups.append({"parent_id": principal_id, "child_id": subordinate_id, "is_active": True})
         subs_per_supervisor = len(agents) // len(supervisors)
-        for index, created_supervisor in enumerate(supervisors):
+        for index, supervisor_id in enumerate(supervisors):
             subordinates = agents[index * subs_per_supervisor: (index + 1) * subs_per_supervisor]
-            for subordinate in subordinates:
-                group = UsersGroup(parent_id=created_supervisor.id, child_id=subordinate.id, is_active=True)
-                session.add(group)
+            for subordinate_id in subordinates:
+                groups.append({"parent_id": supervisor_id, "child_id": subordinate_id, "is_active": True})
+        session.execute(insert(UsersGroup), groups)
         session.commit()
         count = session.query(User).count()
         session.close()
@@ -216,12 +233,13 @@ def load_conversations(users_start: int, users_end: int) -> bool|None:
     """
     fake = Faker()
     with closing(next(get_session("multiagent"))) as session:
+        states = {state.id: state for state in session.query(ConversationState).all()}
+        conversations, messages = [], []
         # Create assigned conversations
         for _ in range(30):
             state_id = fake.random_int(1, 3)
-            state = session.query(ConversationState).filter(ConversationState.id == state_id).first()
+            state = states.get(state_id)
             user_id = fake.random_int(users_start, users_end) if state.id in [1, 2] else None
-            user = session.query(User).filter(User.id == user_id).first()
             phone = fake.phone_number()
             conversation = Conversation(
                 conversation_id=f'{phone}-{uuid.uuid4()}',
@@ -238,8 +256,10 @@ def load_conversations(users_start: int, users_end: int) -> bool|None:
                     conversation=conversation,
                     user_id=user_id if i % 2 != 0 else None,
                 )
-                session.add(message)
-            session.add(conversation)
+                messages.append(message)
+            conversations.append(conversation)
+        # Add everything at once so the flush batches the INSERTs of each table
+        session.add_all(conversations + messages)
         session.commit()
         session.close()
     logger.info("Conversations created")
@@ -261,8 +281,8 @@ def load_templates() -> bool:
         if count > 0:
             logger.info("Templates already exist")
             return False
-        with open(cd + "/templates.json", "r", encoding="utf-8") as file:
-            templates = json.load(file)
+        with open(cd + "/templates.json", "rb") as file:
+            templates = orjson.loads(file.read())
         for template_dict in templates:
             template = Template(
                 content=template_dict.get("content")
@@ -0,0 +1,163 @@
+import redis.asyncio as aioredis
+from typing import Awaitable, Callable
+from app.config import settings
+from app.utilities.logger import logger
+
+import asyncio
+import json
+import time
+
+
+# Delayed jobs live in a Redis sorted set scored by their due timestamp, so
+# they survive restarts and any worker can run them once they are due.
+_JOBS_KEY = "multiagent:jobs"
+
+# Names of the jobs scheduled by the application
+DEFAULT_MESSAGE_JOB = "send_default_message"
+
+_handlers: dict[str, Callable[..., Awaitable[None]]] = {}
+_redis: aioredis.Redis | None = None
+_poller: asyncio.Task | None = None
+# Keeps running jobs referenced until they finish
+_running: set[asyncio.Task] = set()
+
+
+def _get_redis() -> aioredis.Redis:
+    """
+    Retrieves the Redis client used by the job queue, creating it on first use.
+
+    Returns:
+        aioredis.Redis: The Redis client.
+    """
+    global _redis
+    if _redis is None:
+        _redis = aioredis.Redis(host=settings.redis_host, port=settings.redis_port)
+    return _redis
+
+
+def _encode(name: str, *args) -> str:
+    """
+    Encodes a job as the member stored in the sorted set.
+
+    Args:
+        name (str): The name of the job handler.
+        *args: The arguments of the job, which must be JSON serializable.
+
+    Returns:
+        str: The encoded job.
+    """
+    return json.dumps([name, *args], separators=(",", ":"))
+
+
+def job(name: str) -> Callable:
+    """
+    Registers a coroutine function as the handler of a job.
+
+    Args:
+        name (str): The name the job is scheduled with.
+
+    Returns:
+        Callable: A decorator that registers the handler and returns it unchanged.
+    """
+    def decorator(handler: Callable[..., Awaitable[None]]) -> Callable[..., Awaitable[None]]:
+        _handlers[name] = handler
+        return handler
+    return decorator
+
+
+async def schedule(name: str, *args, delay: float) -> None:
+    """
+    Schedules a job to run after a delay.
+
+    Scheduling the same job with the same arguments again moves its due time.
+
+    Args:
+        name (str): The name of the job handler.
+        *args: The arguments of the job, which must be JSON serializable.
+        delay (float): The delay in seconds.
+    """
+    await _get_redis().zadd(_JOBS_KEY, {_encode(name, *args): time.time() + delay})
+
+
+async def cancel(name: str, *args) -> bool:
+    """
+    Cancels a scheduled job.
+
+    Failures are only logged, since jobs check whether they are still needed
+    when they run.
+
+    Args:
+        name (str): The name of the job handler.
+        *args: The arguments the job was scheduled with.
+
+    Returns:
+        bool: Whether the job was still pending.
+    """
+    try:
+        return bool(await _get_redis().zrem(_JOBS_KEY, _encode(name, *args)))
+    except Exception as e:
+        logger.error(f"Error cancelling job {name}: {e}")
+    return False
+
+
+async def _run(member: bytes) -> None:
+    """
+    Runs a due job.
+
+    Args:
+        member (bytes): The encoded job.
+    """
+    name, *args = json.loads(member)
+    handler = _handlers.get(name)
+    if handler is None:
+        logger.error(f"No handler registered for job {name}")
+        return
+    try:
+        await handler(*args)
+    except Exception as e:
+        logger.error(f"Error running job {name}: {e}")
+
+
+async def _poll_jobs() -> None:
+    """
+    Runs due jobs until cancelled.
+
+    A job is only run by the worker whose ZREM removes it, so each job runs
+    once even when several application workers poll the same set.
+    """
+    client = _get_redis()
+    while True:
+        try:
+            due = await client.zrangebyscore(_JOBS_KEY, 0, time.time())
+            for member in due:
+                if await client.zrem(_JOBS_KEY, member):
+                    task = asyncio.create_task(_run(member))
+                    _running.add(task)
+                    task.add_done_callback(_running.discard)
+        except Exception as e:
+            logger.error(f"Error polling jobs: {e}")
+        await asyncio.sleep(settings.jobs_poll_interval)
+
+
+def start_job_poller() -> None:
+    """
+    Starts polling the job queue.
+    """
+    global _poller
+    if _poller is None:
+        _poller = asyncio.create_task(_poll_jobs())
+
+
+async def stop_job_poller() -> None:
+    """
+    Stops polling the job queue and closes its Redis client. Pending jobs stay
+    in Redis for the next start.
+    """
+    global _poller, _redis
+    if _poller is not None:
+        _poller.cancel()
+        await asyncio.gather(_poller, return_exceptions=True)
+        _poller = None
+    if _redis is not None:
+        await _redis.aclose()
+        _redis = None
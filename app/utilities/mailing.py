@@ -1,5 +1,9 @@
+import asyncio
 import os
 import smtplib
+from functools import cache
+from threading import Lock, Thread
+from typing import Callable
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
 from email.mime.image import MIMEImage
@@ -12,6 +16,133 @@ from app.templates.email import (
 
 cd = os.path.dirname(os.path.abspath(__file__))
 
+# Authenticated SMTP session shared by every email, so the TLS handshake and
+# login only happen when the server has dropped the previous connection
+_smtp: smtplib.SMTP_SSL | None = None
+_smtp_lock = Lock()
+
+# Emails are queued by the request handlers and sent one at a time by a single
+# worker, since every send goes through the same SMTP session anyway
+_email_queue: asyncio.Queue | None = None
+_email_worker: asyncio.Task | None = None
+
+
+def _get_smtp() -> smtplib.SMTP_SSL:
+    """
+    Returns the shared SMTP session, reconnecting if it is missing or stale.
+
+    Must be called while holding ``_smtp_lock``.
+
+    Returns:
+        smtplib.SMTP_SSL: An authenticated SMTP session.
+    """
+    global _smtp
+    if _smtp is not None:
+        try:
+            if _smtp.noop()[0] == 250:
+                return _smtp
+        except (smtplib.SMTPException, OSError):
+            pass
+        _close_smtp()
+    smtp = smtplib.SMTP_SSL(settings.smtp_server, settings.smtp_port)
+    try:
+        smtp.login(settings.smtp_sender, settings.smtp_password)
+    except Exception:
+        smtp.close()
+        raise
+    _smtp = smtp
+    return _smtp
+
+
+def _close_smtp() -> None:
+    """
+    Closes the shared SMTP session, if any.
+
+    Must be called while holding ``_smtp_lock``.
+    """
+    global _smtp
+    if _smtp is None:
+        return
+    try:
+        _smtp.quit()
+    except (smtplib.SMTPException, OSError):
+        _smtp.close()
+    _smtp = None
+
+
+def close_smtp_connection() -> None:
+    """
+    Closes the shared SMTP session on application shutdown.
+    """
+    with _smtp_lock:
+        _close_smtp()
+
+
+def _send_email(email: str, msg: MIMEMultipart) -> None:
+    """
+    Sends a message through the shared SMTP session.
+
+    If the server drops the session between the health check and the send,
+    the message is retried once on a new session.
+
+    Parameters:
+        email (str): The recipient's email address.
+        msg (MIMEMultipart): The message to send.
+    """
+    message = msg.as_string()
+    with _smtp_lock:
+        try:
+            _get_smtp().sendmail(settings.smtp_sender, email, message)
+        except smtplib.SMTPServerDisconnected:
+            _close_smtp()
+            _get_smtp().sendmail(settings.smtp_sender, email, message)
+    logger.info(f"Message sent to {email}")
+
+
+@cache
+def _logo_parts(partner_logo: str) -> tuple[MIMEImage, MIMEImage]:
+    """
+    Builds the inline logo parts referenced by the email templates, once per
+    partner logo. The parts are never modified after they are built, so every
+    message attaches the same objects.
+
+    Parameters:
+        partner_logo (str): The file name of the image shown as the second logo.
+
+    Returns:
+        tuple[MIMEImage, MIMEImage]: The Equirent logo and the partner logo parts.
+    """
+    parts = []
+    for filename, content_id in (("logo.png", "<logo>"), (partner_logo, "<logo2>")):
+        with open(cd + "/../templates/email/images/" + filename, "rb") as png_file:
+            image = MIMEImage(png_file.read())
+        image.add_header('Content-ID', content_id)
+        parts.append(image)
+    return tuple(parts)
+
+
+def _build_message(email: str, subject: str, html_content: str, partner_logo: str) -> MIMEMultipart:
+    """
+    Builds an HTML email around the prebuilt logo parts.
+
+    Parameters:
+        email (str): The recipient's email address.
+        subject (str): The subject of the email.
+        html_content (str): The rendered HTML template.
+        partner_logo (str): The file name of the image shown as the second logo.
+
+    Returns:
+        MIMEMultipart: The message ready to be sent.
+    """
+    msg = MIMEMultipart("alternative")
+    msg["Subject"] = subject
+    msg["From"] = settings.smtp_sender
+    msg["To"] = email
+    msg.attach(MIMEText(html_content, 'html'))
+    for image in _logo_parts(partner_logo):
+        msg.attach(image)
+    return msg
+
 
 def send_account_activation_email(email: str, token: str) -> None:
     # Send the message via our SMTP server
@@ -22,28 +153,9 @@ def send_account_activation_email(email: str, token: str) -> None:
             logger.error("Invalid activation link")
             return
 
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = "Activar cuenta - Multiagente"
-        msg["From"] = settings.smtp_sender
-        msg["To"] = email
-        msg.attach(MIMEText(html_content, 'html'))
-
-        # Attach first logo (Equirent)
-        with open(cd + "/../templates/email/images/logo.png", "rb") as png_file:
-            logo_image = MIMEImage(png_file.read())
-            logo_image.add_header('Content-ID', '<logo>')
-            msg.attach(logo_image)
-
-        # Attach second logo (Bureau Veritas)
-        with open(cd + "/../templates/email/images/bureau_veritas.png", "rb") as png_file:
-            bureau_veritas_image = MIMEImage(png_file.read())
-            bureau_veritas_image.add_header('Content-ID', '<logo2>')
-            msg.attach(bureau_veritas_image)
-
-        with smtplib.SMTP_SSL(settings.smtp_server, settings.smtp_port) as smtp:
-            smtp.login(settings.smtp_sender, settings.smtp_password)
-            smtp.sendmail(settings.smtp_sender, email, msg.as_string())
-            logger.info(f"Message sent to {email}")
+        # Equirent and Bureau Veritas logos
+        msg = _build_message(email, "Activar cuenta - Multiagente", html_content, "bureau_veritas.png")
+        _send_email(email, msg)
     except Exception as e:
         logger.error(f"Error sending email: {e}")
 
@@ -72,27 +184,91 @@ def send_password_reset_email(email: str, token: str) -> None:
             logger.error("Invalid reset link")
             return
 
-        msg = MIMEMultipart("alternative")
-        msg["Subject"] = "Restablecer contraseña - Multiagente"
-        msg["From"] = settings.smtp_sender
-        msg["To"] = email
-        msg.attach(MIMEText(html_content, 'html'))
-
-        # Attach first logo (Equirent)
-        with open(cd + "/../templates/email/images/logo.png", "rb") as png_file:
-            logo_image = MIMEImage(png_file.read())
-            logo_image.add_header('Content-ID', '<logo>')
-            msg.attach(logo_image)
-
-        # Attach second logo (Bureau Veritas)
-        with open(cd + "/../templates/email/images/logo2.png", "rb") as png_file:
-            bureau_veritas_image = MIMEImage(png_file.read())
-            bureau_veritas_image.add_header('Content-ID', '<logo2>')
-            msg.attach(bureau_veritas_image)
-
-        with smtplib.SMTP_SSL(settings.smtp_server, settings.smtp_port) as smtp:
-            smtp.login(settings.smtp_sender, settings.smtp_password)
-            smtp.sendmail(settings.smtp_sender, email, msg.as_string())
-            logger.info(f"Message sent to {email}")
+        # Equirent logo and the second logo of the reset email
+        msg = _build_message(email, "Restablecer contraseña - Multiagente", html_content, "logo2.png")
+        _send_email(email, msg)
     except Exception as e:
         logger.error(f"Error sending email: {e}")
+
+
+async def _send_queued_emails(queue: asyncio.Queue) -> None:
+    """
+    Sends the queued emails in a worker thread, one at a time.
+
+    Args:
+        queue (asyncio.Queue): The queue of emails to send.
+    """
+    while True:
+        send, args = await queue.get()
+        try:
+            await asyncio.to_thread(send, *args)
+        except Exception as e:
+            logger.error(f"Error in email worker: {e}")
+        finally:
+            queue.task_done()
+
+
+def start_email_worker() -> None:
+    """
+    Starts the worker that sends queued emails.
+    """
+    global _email_queue, _email_worker
+    _email_queue = asyncio.Queue()
+    _email_worker = asyncio.create_task(_send_queued_emails(_email_queue))
+
+
+async def stop_email_worker() -> None:
+    """
+    Stops the email worker once the queued emails are sent, or once
+    settings.shutdown_drain_timeout expires, whichever happens first.
+    """
+    global _email_queue, _email_worker
+    if _email_worker is not None:
+        try:
+            await asyncio.wait_for(_email_queue.join(), settings.shutdown_drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"Stopping email worker with {_email_queue.qsize()} emails still queued")
+        _email_worker.cancel()
+        await asyncio.gather(_email_worker, return_exceptions=True)
+    _email_queue = None
+    _email_worker = None
+
+
+def _enqueue_email(send: Callable[[str, str], None], email: str, token: str) -> None:
+    """
+    Queues an email to be sent by the email worker.
+
+    Parameters:
+        send (Callable[[str, str], None]): The function that builds and sends the email.
+        email (str): The recipient's email address.
+        token (str): The token included in the email link.
+    """
+    if _email_queue is None:
+        # Not running (e.g. outside the application lifespan), so the email is
+        # sent from its own thread instead of being lost
+        logger.error(f"Email worker is not running, sending email to {email} in a thread")
+        Thread(target=send, args=(email, token), name="email-fallback").start()
+        return
+    _email_queue.put_nowait((send, (email, token)))
+
+
+def enqueue_account_activation_email(email: str, token: str) -> None:
+    """
+    Queues the account activation email of a new user.
+
+    Parameters:
+        email (str): The email address of the new user.
+        token (str): The activation token included in the link.
+    """
+    _enqueue_email(send_account_activation_email, email, token)
+
+
+def enqueue_password_reset_email(email: str, token: str) -> None:
+    """
+    Queues a password reset email.
+
+    Parameters:
+        email (str): The email address of the user resetting the password.
+        token (str): The reset token included in the link.
+    """
+    _enqueue_email(send_password_reset_email, email, token)
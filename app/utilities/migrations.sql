@@ -0,0 +1,7 @@
+-- Cambios de esquema sobre tablas existentes (SQL Server).
+-- initialize_database los aplica al iniciar el aplicativo; este script permite
+-- aplicarlos manualmente antes de un despliegue. Es seguro ejecutarlo varias veces.
+
+-- Estado de envío de los mensajes de agentes (NULL se considera enviado)
+IF COL_LENGTH('tbl_mensajes', 'estado_envio') IS NULL
+    ALTER TABLE tbl_mensajes ADD estado_envio VARCHAR(7) NULL;
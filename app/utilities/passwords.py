@@ -0,0 +1,116 @@
+from cachetools import TTLCache
+from functools import cache
+from threading import Lock
+from app.config import settings
+from app.utilities.logger import logger
+
+import bcrypt
+import hashlib
+import hmac
+import math
+import secrets
+import time
+
+
+# Recently verified (hash, password) pairs, keyed by an HMAC under a
+# per-process key so plain passwords are never kept in memory. Only
+# successful checks are cached, and the stored hash is part of the key,
+# so a password change invalidates the entry by itself.
+_verified_passwords = TTLCache(maxsize=1024, ttl=60)
+_verified_passwords_lock = Lock()
+_verified_passwords_key = secrets.token_bytes(32)
+
+
+def calibrate_bcrypt_rounds(target_ms: int, samples: int = 3) -> int:
+    """
+    Estimates the bcrypt cost whose hashing time is closest to a target on this CPU.
+
+    Each extra round doubles the work, so a single measurement at a cheap
+    cost is enough to extrapolate the rest.
+
+    Args:
+    target_ms (int): The desired hashing time in milliseconds.
+    samples (int): The number of timing samples to take. Defaults to 3.
+
+    Returns:
+    int: The estimated number of rounds, between 10 and 16.
+    """
+    base_rounds = 10
+    salt = bcrypt.gensalt(base_rounds)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        bcrypt.hashpw(b"calibration-password", salt)
+        timings.append((time.perf_counter() - start) * 1000)
+    elapsed_ms = sorted(timings)[len(timings) // 2]
+    rounds = base_rounds + round(math.log2(target_ms / elapsed_ms))
+    return max(10, min(16, rounds))
+
+
+def configure_password_hashing() -> None:
+    """
+    Sets the bcrypt cost used for new password hashes.
+
+    When ``settings.bcrypt_target_ms`` is set, the cost is calibrated against
+    the current CPU and stored back in ``settings.bcrypt_rounds``.
+    """
+    if settings.bcrypt_target_ms > 0:
+        settings.bcrypt_rounds = calibrate_bcrypt_rounds(settings.bcrypt_target_ms)
+        logger.info(f"Using {settings.bcrypt_rounds} bcrypt rounds")
+
+
+@cache
+def _dummy_hash() -> bytes:
+    """
+    Builds the hash checked for accounts without a password, at the current cost.
+
+    Returns:
+    bytes: A bcrypt hash of a random password.
+    """
+    return bcrypt.hashpw(secrets.token_bytes(16), bcrypt.gensalt(settings.bcrypt_rounds))
+
+
+def verify_password(plain_password: str, hashed_password: str | None) -> bool:
+    """
+    Verifies a plain password against a hashed password.
+
+    Args:
+    plain_password (str): The plain password to verify.
+    hashed_password (str | None): The hashed password to verify against, None if the account has no password.
+
+    Returns:
+    bool: Whether the plain password matches the hashed password.
+    """
+    plain_password = plain_password.encode("utf-8")
+    if not hashed_password:
+        # Accounts pending activation have no password yet; a check against a
+        # dummy hash keeps their response time in line with the others
+        bcrypt.checkpw(plain_password, _dummy_hash())
+        return False
+    hashed_password = hashed_password.encode("utf-8")
+    cache_key = hmac.new(
+        _verified_passwords_key, hashed_password + b"\0" + plain_password, hashlib.sha256
+    ).digest()
+    with _verified_passwords_lock:
+        if cache_key in _verified_passwords:
+            return True
+    if not bcrypt.checkpw(plain_password, hashed_password):
+        return False
+    with _verified_passwords_lock:
+        _verified_passwords[cache_key] = True
+    return True
+
+
+def get_password_hash(password: str) -> str:
+    """
+    Generates a hashed password from a plain password.
+
+    Args:
+    password (str): The plain password to hash.
+
+    Returns:
+    str: The hashed password.
+    """
+    return bcrypt.hashpw(
+        password.encode("utf-8"), bcrypt.gensalt(settings.bcrypt_rounds)
+    ).decode("utf-8")
@@ -1,4 +1,5 @@
 import redis.asyncio as aioredis
+from typing import Iterable
 from app.utilities.logger import logger
 
 
@@ -14,27 +15,27 @@ class RedisPubSubManager:
     def __init__(self, host='localhost', port=6379):
         self.redis_host = host
         self.redis_port = port
+        self.connection_pool = None
         self.redis_connection = None
-        self.pubsub = None
+        # pubsubs: {room_id: PubSub}, each subscription reads on its own connection
+        self.pubsubs: dict[str, aioredis.client.PubSub] = {}
 
     async def _get_redis_connection(self) -> aioredis.Redis:
         """
-        Establishes a connection to Redis.
+        Establishes a connection to Redis backed by the manager's connection pool.
 
         Returns:
             aioredis.Redis: Redis connection object.
         """
-        return aioredis.Redis(host=self.redis_host,
-                              port=self.redis_port,
-                              auto_close_connection_pool=False)
+        return aioredis.Redis(connection_pool=self.connection_pool)
 
     async def _connect(self) -> None:
         """
-        Connects to the Redis server and initializes the pubsub client.
+        Connects to the Redis server through a connection pool.
         """
         logger.info("Connecting to redis...")
+        self.connection_pool = aioredis.ConnectionPool(host=self.redis_host, port=self.redis_port)
         self.redis_connection = await self._get_redis_connection()
-        self.pubsub = self.redis_connection.pubsub()
 
     async def _publish(self, room_id: str, message: str) -> None:
         """
@@ -48,28 +49,47 @@ class RedisPubSubManager:
             await self._connect()
         await self.redis_connection.publish(room_id, message)
 
-    async def subscribe(self, room_id: str) -> aioredis.Redis:
+    async def _publish_many(self, room_ids: Iterable[str], message: str) -> None:
         """
-        Subscribes to a Redis channel.
+        Publishes the same message to several Redis channels in a single round trip.
+
+        Args:
+            room_ids (Iterable[str]): Channel or room IDs.
+            message (str): Message to be published.
+        """
+        if self.redis_connection is None:
+            await self._connect()
+        async with self.redis_connection.pipeline(transaction=False) as pipe:
+            for room_id in room_ids:
+                pipe.publish(room_id, message)
+            await pipe.execute()
+
+    async def subscribe(self, room_id: str) -> aioredis.client.PubSub:
+        """
+        Subscribes to a Redis channel with a PubSub object of its own, so
+        channels do not queue behind each other on a shared connection.
 
         Args:
             room_id (str): Channel or room ID to subscribe to.
 
         Returns:
-            aioredis.ChannelSubscribe: PubSub object for the subscribed channel.
+            aioredis.client.PubSub: PubSub object for the subscribed channel.
         """
         if self.redis_connection is None:
             await self._connect()
-        await self.pubsub.subscribe(room_id)
-        return self.pubsub
+        pubsub = self.redis_connection.pubsub()
+        await pubsub.subscribe(room_id)
+        self.pubsubs[room_id] = pubsub
+        return pubsub
 
     async def unsubscribe(self, room_id: str) -> None:
         """
-        Unsubscribes from a Redis channel.
+        Unsubscribes from a Redis channel. The reader of the channel closes its
+        PubSub object once the unsubscription is confirmed.
 
         Args:
             room_id (str): Channel or room ID to unsubscribe from.
         """
-        if self.redis_connection is None:
-            await self._connect()
-        await self.pubsub.unsubscribe(room_id)
\ No newline at end of file
+        pubsub = self.pubsubs.pop(room_id, None)
+        if pubsub is not None:
+            await pubsub.unsubscribe(room_id)
\ No newline at end of file
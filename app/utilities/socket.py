@@ -1,5 +1,5 @@
 from fastapi import WebSocket
-from typing import Dict, List, Literal, Optional
+from typing import Dict, Iterable, List, Literal, Optional
 from pydantic import BaseModel
 from enum import Enum
 from app.config import settings
@@ -12,7 +12,6 @@ from app.models.websockets import (
     MessageData
 )
 
-import json
 import asyncio
 
 
@@ -53,12 +52,15 @@ class WebSocketManager:
         Attributes:
             notifications (dict): A dictionary to store WebSocket notifications.
             conversations (dict): A dictionary to store WebSocket chats.
+            user_to_conversations (dict): A dictionary to find the chats a user is connected to.
             lock (asyncio.Lock): A lock to prevent race conditions when modifying shared resources.
         """
         # notifications: {user_id: [WebSocket, WebSocket, ...]}
         self.notifications: Dict[int, List[WebSocket]] = {}
         # conversations: {conversation_id: {user_id: [WebSocket, WebSocket, ...]}}
         self.conversations: Dict[int, Dict[int, List[WebSocket]]] = {}
+        # user_to_conversations: {user_id: {conversation_id, ...}}
+        self.user_to_conversations: Dict[int, set[int]] = {}
         self.pubsub_client = RedisPubSubManager(settings.redis_host, 6379)
         self.lock = asyncio.Lock()  # Add a lock to protect shared resources
 
@@ -93,6 +95,7 @@ class WebSocketManager:
                 if ws_config.user_id not in self.conversations[ws_config.conversation_id]:
                     self.conversations[ws_config.conversation_id][ws_config.user_id] = []
                 self.conversations[ws_config.conversation_id][ws_config.user_id].append(websocket)
+                self.user_to_conversations.setdefault(ws_config.user_id, set()).add(ws_config.conversation_id)
             logger.info(f"WebSocket connection added: {ws_config}")
         
     async def send_notification(self, user_id: int, notification: Notification) -> None:
@@ -103,12 +106,38 @@ class WebSocketManager:
             user_id (int): User identifier.
             notification (Notification): Notification object.
         """
-        await self.pubsub_client._publish(
-            f"user_{user_id}",
-            notification.model_dump_json(exclude_none=True)
-        )
+        await self.send_raw(user_id, notification.model_dump_json(exclude_none=True))
+
+    async def send_raw(self, user_id: int, payload: str) -> None:
+        """
+        Sends an already serialized notification to a user.
+
+        Args:
+            user_id (int): User identifier.
+            payload (str): Notification serialized as JSON.
+        """
+        await self.pubsub_client._publish(f"user_{user_id}", payload)
         logger.info(f"Notification published through user_{user_id} redis channel")
     
+    async def broadcast(self, user_ids: Iterable[int], notification: Notification) -> None:
+        """
+        Sends the same notification to several users.
+
+        The notification is serialized once and published to every user
+        channel in a single Redis round trip.
+
+        Args:
+            user_ids (Iterable[int]): User identifiers.
+            notification (Notification): Notification object.
+        """
+        channels = [f"user_{user_id}" for user_id in user_ids]
+        if not channels:
+            return
+        await self.pubsub_client._publish_many(
+            channels, notification.model_dump_json(exclude_none=True)
+        )
+        logger.info(f"Notification published through {len(channels)} user redis channels")
+    
     async def send_message(self, conversation_id: int, message: MessageData) -> None:
         """
         Sends a message to all users in a conversation.
@@ -139,11 +168,12 @@ class WebSocketManager:
                         del self.notifications[ws_config.user_id]
                         await self.pubsub_client.unsubscribe(f"user_{ws_config.user_id}")
                         logger.info(f"Unsubscribed from user_{ws_config.user_id} redis channel")
-                    # Remove connections from conversations
-                    for conversation_id in self.conversations:
-                        if ws_config.user_id in self.conversations[conversation_id]:
+                    # Remove connections from the conversations the user is connected to
+                    for conversation_id in self.user_to_conversations.pop(ws_config.user_id, ()):
+                        if ws_config.user_id in self.conversations.get(conversation_id, {}):
                             del self.conversations[conversation_id][ws_config.user_id]
                             if len(self.conversations[conversation_id].keys()) == 0:
+                                del self.conversations[conversation_id]
                                 await self.pubsub_client.unsubscribe(f"conversation_{conversation_id}")
                                 logger.info(f"Unsubscribed from conversation_{conversation_id} redis channel")
                 elif ws_config.ws_type == WebSocketType.CONVERSATION:
@@ -151,47 +181,100 @@ class WebSocketManager:
                     if ws_config.conversation_id in self.conversations:
                         if ws_config.user_id in self.conversations[ws_config.conversation_id]:
                             del self.conversations[ws_config.conversation_id][ws_config.user_id]
+                        user_conversations = self.user_to_conversations.get(ws_config.user_id)
+                        if user_conversations is not None:
+                            user_conversations.discard(ws_config.conversation_id)
+                            if not user_conversations:
+                                del self.user_to_conversations[ws_config.user_id]
                         if len(self.conversations[ws_config.conversation_id].keys()) == 0:
+                            del self.conversations[ws_config.conversation_id]
                             await self.pubsub_client.unsubscribe(f"conversation_{ws_config.conversation_id}")
                             logger.info(f"Unsubscribed from conversation_{ws_config.conversation_id} redis channel")
                 logger.info(f"WebSocket connection removed: {ws_config}")
             except KeyError:
                 logger.error("WebSocket connection not found")
 
+    @staticmethod
+    async def _fan_out(connections: List[WebSocket], payload: str) -> set[WebSocket]:
+        """
+        Sends a payload to several WebSocket connections concurrently.
+
+        Args:
+            connections (List[WebSocket]): WebSocket connections.
+            payload (str): Payload serialized as JSON.
+
+        Returns:
+            set[WebSocket]: The connections whose send failed.
+        """
+        results = await asyncio.gather(
+            *(connection.send_text(payload) for connection in connections),
+            return_exceptions=True
+        )
+        failed = set()
+        for connection, result in zip(connections, results):
+            if isinstance(result, Exception):
+                logger.error(f"Error sending through WebSocket connection: {result}")
+                failed.add(connection)
+        return failed
+
+    @staticmethod
+    def _prune(connections: Optional[List[WebSocket]], failed: set[WebSocket]) -> None:
+        """
+        Removes the failed WebSocket connections from a list of connections.
+
+        Args:
+            connections (Optional[List[WebSocket]]): WebSocket connections, if still tracked.
+            failed (set[WebSocket]): The connections to remove.
+        """
+        if connections:
+            connections[:] = [connection for connection in connections if connection not in failed]
+
     async def _pubsub_data_reader(self, pubsub_subscriber):
         """
         Reads and broadcasts messages received from Redis PubSub.
 
         Args:
-            pubsub_subscriber (aioredis.ChannelSubscribe): PubSub object for the subscribed channel.
+            pubsub_subscriber (aioredis.client.PubSub): PubSub object for the subscribed channel.
         """
-        while True:
-            try:
-                async with self.lock:  # Ensure only one coroutine interacts with the subscriber
-                    message = await pubsub_subscriber.get_message(ignore_subscribe_messages=True)
-                if message is not None:
+        try:
+            # Each subscription has its own PubSub object; listen() waits on its
+            # socket and stops once the channel is unsubscribed
+            async for message in pubsub_subscriber.listen():
+                if message['type'] == 'message':
                     room_id: str = message['channel'].decode('utf-8')
                     if room_id.startswith("user_"):
                         user_id = int(room_id.removeprefix("user_"))
-                        notification = Notification(**json.loads(message['data'].decode('utf-8')))
-                        async with self.lock:
-                            if user_id in self.notifications:
-                                for connection in self.notifications[user_id]:
-                                    await connection.send_json(notification.model_dump(exclude_none=True))
+                        # Parse and serialize through pydantic-core to skip the json module round-trip
+                        notification = Notification.model_validate_json(message['data'])
+                        # Send to a snapshot of the connections, so a slow socket
+                        # does not hold the lock other readers and handlers need
+                        connections = list(self.notifications.get(user_id, ()))
+                        payload = notification.model_dump_json(exclude_none=True)
+                        failed = await self._fan_out(connections, payload)
+                        if failed:
+                            async with self.lock:
+                                self._prune(self.notifications.get(user_id), failed)
                     elif room_id.startswith("conversation_"):
                         conversation_id = int(room_id.removeprefix("conversation_"))
-                        message_data = MessageData(**json.loads(message['data'].decode('utf-8')))
-                        async with self.lock:
-                            if conversation_id in self.conversations:
-                                for user_id in self.conversations[conversation_id]:
-                                    for connection in self.conversations[conversation_id][user_id]:
-                                        await connection.send_json(ChatWebSocketResponse(
-                                            type=ChatWebSocketResponseType.MESSAGE,
-                                            message=message_data,
-                                        ).model_dump(exclude_none=True))
-            except Exception as e:
-                logger.error(f"Error in _pubsub_data_reader: {e}")
-                break
-
+                        message_data = MessageData.model_validate_json(message['data'])
+                        connections = [
+                            connection
+                            for user_connections in self.conversations.get(conversation_id, {}).values()
+                            for connection in user_connections
+                        ]
+                        # Build the response once, every recipient gets the same frame
+                        payload = ChatWebSocketResponse(
+                            type=ChatWebSocketResponseType.MESSAGE,
+                            message=message_data,
+                        ).model_dump_json(exclude_none=True)
+                        failed = await self._fan_out(connections, payload)
+                        if failed:
+                            async with self.lock:
+                                for user_connections in self.conversations.get(conversation_id, {}).values():
+                                    self._prune(user_connections, failed)
+        except Exception as e:
+            logger.error(f"Error in _pubsub_data_reader: {e}")
+        finally:
+            await pubsub_subscriber.aclose()
 
 socket_manager = WebSocketManager()
\ No newline at end of file
@@ -1,14 +1,14 @@
 import msgpack
-import json
+import orjson
 import os
 import sqlite3
 from contextlib import closing
 from msgpack import ExtType
 
 
-def unpack_msgpack(data):
+def unpack_msgpack(data, ext_hook=ExtType):
     try:
-        unpacked_data = msgpack.unpackb(data)
+        unpacked_data = msgpack.unpackb(data, ext_hook=ext_hook)
         # print("Datos desempaquetados:", unpacked_data)
         return unpacked_data
     except Exception as e:
@@ -33,14 +33,15 @@ if (os.path.exists(DB_PATH)):
     with closing(sqlite3.connect(DB_PATH, check_same_thread=False)) as conn:
         with closing(conn.cursor()) as cursor:
             cursor.execute("SELECT * FROM checkpoints ORDER BY thread_id DESC LIMIT 1;")
-            data = cursor.fetchall()
+            data = cursor.fetchone()
 
-    # print(data[0][5])
-    messages = []
-    unpacked = unpack_msgpack(data[0][5])
-    for msg in (unpacked)['channel_values']['messages']:
-        unpacked_msg = msgpack.unpackb(msg.data)
-        messages.append(unpacked_msg)
+    # print(data[5])
+    # Los mensajes (ExtType 5) se desempaquetan en la misma pasada del decodificador
+    unpacked = unpack_msgpack(data[5], ext_hook=ext_type_decoder)
+    messages = [
+        msg["decoded_data"] if isinstance(msg, dict) else msgpack.unpackb(msg.data)
+        for msg in unpacked['channel_values']['messages']
+    ]
     
-    json_data = json.dumps(messages, indent=4)
+    json_data = orjson.dumps(messages, option=orjson.OPT_INDENT_2).decode()
     print("Datos en formato JSON:", json_data)
\ No newline at end of file